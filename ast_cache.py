@@ -0,0 +1,96 @@
+import ast
+import copy
+import io
+import hashlib
+import threading
+import tokenize
+from collections import OrderedDict
+
+# Bound on the total size of the sources whose parse results are kept.
+# ASTs are several times larger than their source, so this is a proxy, not an exact limit.
+MAX_CACHED_SOURCE_BYTES = 64 * 1024 * 1024
+
+def content_hash(source: str) -> str:
+    return hashlib.sha1(source.encode('utf-8', 'surrogatepass')).hexdigest()
+
+class LRUCache:
+    """Thread-safe LRU keyed by content hash, bounded by the summed size of the sources."""
+
+    def __init__(self, max_bytes=MAX_CACHED_SOURCE_BYTES):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (size, value)
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, source, compute):
+        key = content_hash(source)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        value = compute(source)
+        size = len(source)
+        with self._lock:
+            if key not in self._entries and size <= self.max_bytes:
+                self._entries[key] = (size, value)
+                self.total_bytes += size
+                while self.total_bytes > self.max_bytes:
+                    _, (old_size, _) = self._entries.popitem(last=False)
+                    self.total_bytes -= old_size
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries), "bytes": self.total_bytes}
+
+class _Failure:
+    """Cached parse/tokenize error, re-raised on every hit so bad files are not retried."""
+
+    def __init__(self, error):
+        self.error = error.with_traceback(None)  # don't keep the parser's frames alive
+
+def _unwrap(value):
+    if isinstance(value, _Failure):
+        # a fresh copy per hit: re-raising the cached object would chain every
+        # caller's traceback onto it and share it between threads
+        raise copy.copy(value.error)
+    return value
+
+def _parse(source):
+    try:
+        return ast.parse(source)
+    except (SyntaxError, ValueError) as e:
+        return _Failure(e)
+
+def _tokenize(source):
+    try:
+        return tuple(tokenize.generate_tokens(io.StringIO(source).readline))
+    except (tokenize.TokenError, SyntaxError) as e:
+        return _Failure(e)
+
+_ast_cache = LRUCache()
+_token_cache = LRUCache()
+
+def parse(source: str) -> ast.Module:
+    """
+    Process-wide cached ast.parse. The returned tree is shared between callers
+    and must not be modified.
+    """
+    return _unwrap(_ast_cache.get_or_compute(source, _parse))
+
+def generate_tokens(source: str):
+    """Process-wide cached tokenize.generate_tokens, returned as a tuple of TokenInfo."""
+    return _unwrap(_token_cache.get_or_compute(source, _tokenize))
+
+def stats():
+    return {"ast": _ast_cache.stats(), "tokens": _token_cache.stats()}
@@ -0,0 +1,85 @@
+import ast
+import os
+import re
+import sys
+import time
+from chunks import iter_ast_chunks, token_counter
+
+MAX_CHARS = 1200
+
+def approx_token_count(text):
+    """Rough stand-in when tiktoken is not installed: words and punctuation marks."""
+    return len(re.findall(r"\w+|[^\w\s]", text))
+
+def load_py_files(root):
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            if filename.endswith('.py'):
+                path = os.path.join(dirpath, filename)
+                with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+                    yield path, f.read()
+
+def synthetic_dags(count=50, tasks=60):
+    """DAG files with multi-line nested operator calls, the case the line regex splits mid-expression."""
+    for n in range(count):
+        lines = ["from airflow import DAG", "from airflow.utils.task_group import TaskGroup", "",
+                 f"with DAG('dag_{n}', schedule_interval=None, default_args={{", "    'owner': 'data',", "}) as dag:"]
+        for i in range(tasks):
+            lines += [
+                f"    t{i} = BigQueryInsertJobOperator(",
+                f"        task_id='load_{i}',",
+                "        configuration={",
+                "            'query': {",
+                f"                'query': read_sql('sql/load_{i}.sql'),",
+                "                'useLegacySql': False,",
+                "            },",
+                "        },",
+                "        params=dict(",
+                f"            table='T_{i}',",
+                "        ),",
+                "    )",
+            ]
+            if i % 20 == 19:
+                lines += [f"    with TaskGroup('group_{i}') as group_{i}:",
+                          f"        done_{i} = EmptyOperator(task_id='done_{i}')"]
+        lines.append("    " + " >> ".join(f"t{i}" for i in range(tasks)))
+        yield f"synthetic/dag_{n}.py", "\n".join(lines) + "\n"
+
+def parses(text):
+    try:
+        ast.parse(text)
+        return True
+    except SyntaxError:
+        return False
+
+def run(files, fallback, count_tokens):
+    totals = {"chunks": 0, "chars": 0, "tokens": 0, "unparsable": 0, "seconds": 0.0}
+    for _, code in files:
+        started = time.perf_counter()
+        try:
+            chunks = list(iter_ast_chunks(code, MAX_CHARS, fallback=fallback))
+        except SyntaxError:
+            continue
+        totals["seconds"] += time.perf_counter() - started
+        for chunk in chunks:
+            totals["chunks"] += 1
+            totals["chars"] += len(chunk.text)
+            totals["tokens"] += count_tokens(chunk.text)
+            totals["unparsable"] += not parses(chunk.text)
+    return totals
+
+if __name__ == "__main__":
+    files = list(load_py_files(sys.argv[1])) if len(sys.argv) > 1 else list(synthetic_dags())
+    try:
+        count_tokens = token_counter()
+        token_label = "tokens"
+    except ImportError:
+        count_tokens = approx_token_count
+        token_label = "~tokens"
+
+    print(f"{len(files)} files, max {MAX_CHARS} chars per chunk")
+    print(f"{'fallback':>8} {'chunks':>8} {'chars':>10} {token_label:>10} {'unparsable':>11} {'seconds':>8}")
+    for fallback in ("regex", "ast"):
+        totals = run(files, fallback, count_tokens)
+        print(f"{fallback:>8} {totals['chunks']:>8} {totals['chars']:>10} {totals['tokens']:>10} "
+              f"{totals['unparsable']:>11} {totals['seconds']:>8.3f}")
@@ -0,0 +1,95 @@
+import re
+import sys
+import time
+from sql_lineage import extract_tables, is_parameterized
+
+# Legacy regexes, as in extracttablename.py (which runs on import, so they are copied here)
+input_pattern = re.compile(
+    r'\b(?:FROM|JOIN)\s+[`"\']?([a-zA-Z0-9_\-\.<>{}\[\]#"]+)[`"\']?',
+    re.IGNORECASE
+)
+output_pattern = re.compile(
+    r'\b(?:INSERT\s+INTO|CREATE\s+TABLE|CREATE\s+OR\s+REPLACE\s+TABLE|'
+    r'CREATE\s+OR\s+REPLACE\s+VIEW|MERGE\s+INTO|REPLACE\s+TABLE|'
+    r'DROP\s+TABLE(?:\s+IF\s+EXISTS)?)\s+[`"\']?([a-zA-Z0-9_\-\.<>{}\[\]#"]+)[`"\']?',
+    re.IGNORECASE
+)
+
+def legacy_extract_tables(sql_text):
+    input_tables = []
+    output_tables = []
+    cte_names = set()
+    for match in output_pattern.findall(sql_text):
+        table = match.strip()
+        output_tables.append((table, 'output-unresolved' if is_parameterized(table) else 'Output'))
+    for match in re.findall(r'\b(?:DROP\s+TABLE(?:\s+IF\s+EXISTS)?|DELETE\s+FROM)\s+[`"]?([a-zA-Z0-9_\-\.{}]+)[`"]?',
+                            sql_text, re.IGNORECASE):
+        table = match.strip()
+        output_tables.append((table, 'output-unresolved' if is_parameterized(table) else 'Output'))
+    for cte_name, source_table in re.findall(r'(\w+)\s+AS\s*\(\s*SELECT.*?FROM\s+([a-zA-Z0-9_\-\.<>]+)',
+                                             sql_text, re.IGNORECASE | re.DOTALL):
+        cte_names.add(cte_name.strip())
+        input_tables.append((source_table.strip(), 'input-unresolved' if is_parameterized(source_table) else 'Input'))
+        output_tables.append((cte_name.strip(), 'Output'))
+    for match in input_pattern.findall(sql_text):
+        table = match.strip()
+        if table not in cte_names:
+            input_tables.append((table, 'input-unresolved' if is_parameterized(table) else 'Input'))
+    return input_tables, output_tables
+
+STATEMENT = """
+-- step {n}: refresh staging from the FROM-clause sources below
+CREATE OR REPLACE TABLE AA_SPLTY_PR_CUR.T_STG_{n} AS
+WITH CTE_PHMCY_{n} AS (
+    SELECT p.id, EXTRACT(YEAR FROM p.load_dt) AS yr, 'FROM not_a_table' AS note
+    FROM CORE_SPECIALTY.COMMON_SPECIALTY.T_SPCLT_PHMCY p
+    WHERE p.status <> 'X'
+),
+CTE_PROD_{n} AS (
+    SELECT * FROM `CORE_SPECIALTY.COMMOM_SPECIALTY.T_SPCLT_PROD`
+)
+SELECT a.*, c.ctgry
+FROM CTE_PHMCY_{n} a
+JOIN CTE_PROD_{n} b ON a.id = b.id
+LEFT JOIN AA_SPLTY_PR_SEM.V_SPCLT_PROD_CTGRY c ON c.id = b.id;
+/* INSERT INTO commented_out_{n} */
+INSERT INTO <VAR_AA_DB_SEM_SCHEMA>.<VAR_TGT_TBL> SELECT * FROM <VAR_AA_DB_SEM_SCHEMA>.<VAR_SRC_TBL>;
+DELETE FROM AA_SPLTY_PR_CUR.T_STG_OLD WHERE load_dt < CURRENT_DATE();
+"""
+
+def build_script(target_bytes):
+    parts = []
+    size = 0
+    n = 0
+    while size < target_bytes:
+        statement = STATEMENT.format(n=n)
+        parts.append(statement)
+        size += len(statement)
+        n += 1
+    return "".join(parts)
+
+def best_of(func, text, repeat=3):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(text)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+if __name__ == "__main__":
+    sizes_mb = [float(arg) for arg in sys.argv[1:]] or [1, 4, 16]
+    print(f"{'size':>8} {'legacy s':>10} {'scanner s':>10} {'legacy refs':>12} {'scanner refs':>13}")
+    for size_mb in sizes_mb:
+        script = build_script(int(size_mb * 1024 * 1024))
+        legacy_time, legacy_result = best_of(legacy_extract_tables, script)
+        scanner_time, scanner_result = best_of(extract_tables, script)
+        legacy_refs = len(set(legacy_result[0] + legacy_result[1]))
+        scanner_refs = len(set(scanner_result[0] + scanner_result[1]))
+        print(f"{size_mb:>6}MB {legacy_time:>10.3f} {scanner_time:>10.3f} {legacy_refs:>12} {scanner_refs:>13}")
+
+    # unterminated CTE bodies make the legacy CTE regex rescan to the end of the script for every match
+    pathological = "x AS (SELECT 1 " * 20000
+    legacy_time, _ = best_of(legacy_extract_tables, pathological, repeat=1)
+    scanner_time, _ = best_of(extract_tables, pathological, repeat=1)
+    print(f"pathological {len(pathological) // 1024}KB: legacy {legacy_time:.3f}s, scanner {scanner_time:.3f}s")
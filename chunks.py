@@ -1,93 +1,64 @@
 import ast
 import textwrap
+import ast_cache
+import re
+from collections import namedtuple
 
-def split_ast_code_blocks(code: str, max_chars: int = 1500):
-    """
-    Splits a Python file into chunks based on AST nodes,
-    ensuring each chunk is <= max_chars and syntactically valid.
-    """
-    chunks = []
-    current_chunk = ""
-    current_length = 0
-
-    tree = ast.parse(code)
-    for node in tree.body:
-        # Extract the exact source code for the node
-        block = ast.get_source_segment(code, node)
-        if not block:
-            continue
-
-        block = textwrap.dedent(block).strip()  # Remove extra indentation
-        block_with_space = block + "\n\n"       # Add spacing between blocks
-
-        if current_length + len(block_with_space) > max_chars:
-            # Start a new chunk
-            if current_chunk:
-                chunks.append(current_chunk.strip())
-            current_chunk = block_with_space
-            current_length = len(block_with_space)
-        else:
-            current_chunk += block_with_space
-            current_length += len(block_with_space)
-
-    if current_chunk:
-        chunks.append(current_chunk.strip())
-
-    return chunks
-
-chunks = split_ast_code_blocks(code)
-
-for i, chunk in enumerate(chunks, 1):
-    chunk_name = f"chunk_{i}"
-    print(f"*****************CHUNK_NAME={chunk_name} AND CHUNK_LENGTH={len(chunk)}")
-    print(chunk)
-
-print(f"*******************DONE************************")
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+CodeChunk = namedtuple("CodeChunk", ["text", "start_line", "end_line"])
 
+def token_counter(encoding_name="cl100k_base"):
+    """size_fn that counts model tokens with a local tiktoken encoding (needs tiktoken installed)."""
+    import tiktoken
+    encoding = tiktoken.get_encoding(encoding_name)
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
 
-import ast
-import textwrap
-import re
+def line_offsets(source):
+    """Byte offset of the start of every line of the UTF-8 source, computed once per file."""
+    offsets = [0]
+    for line in source.splitlines(keepends=True):
+        offsets.append(offsets[-1] + len(line))
+    return offsets
 
-def split_by_operator_blocks(code: str, max_chars: int):
+def node_source(source, offsets, node):
+    """
+    Dedented source of a node (decorators included) and its line span.
+    AST columns are UTF-8 byte offsets, so slicing is done on the encoded source.
+    """
+    first = min([node] + getattr(node, 'decorator_list', []), key=lambda n: (n.lineno, n.col_offset))
+    line_start = offsets[first.lineno - 1]
+    start = line_start + first.col_offset
+    if not source[line_start:start].strip() or first is not node:
+        start = line_start  # keep indentation (and a decorator's '@') so dedent lines up
+    end = offsets[node.end_lineno - 1] + node.end_col_offset
+    text = textwrap.dedent(source[start:end].decode('utf-8')).strip()
+    return text, first.lineno, node.end_lineno
+
+def split_by_operator_blocks(code: str, max_chars: int, size_fn=len):
     """
     Fallback: Split large DAG block by individual operator blocks.
     """
     chunks = []
-    current_chunk = ""
+    current_chunk = []
     current_length = 0
 
     lines = code.splitlines(keepends=True)
     operator_block = []
     inside_operator = False
 
-    def flush_operator_block():
+    def add(block):
         nonlocal current_chunk, current_length
-        block = ''.join(operator_block)
-        if current_length + len(block) > max_chars:
-            if current_chunk.strip():
-                chunks.append(current_chunk.strip())
-            current_chunk = block
-            current_length = len(block)
+        size = size_fn(block)
+        if current_length + size > max_chars:
+            if "".join(current_chunk).strip():
+                chunks.append("".join(current_chunk).strip())
+            current_chunk = [block]
+            current_length = size
         else:
-            current_chunk += block
-            current_length += len(block)
+            current_chunk.append(block)
+            current_length += size
+
+    def flush_operator_block():
+        add(''.join(operator_block))
         operator_block.clear()
 
     for line in lines:
@@ -105,84 +76,179 @@ def split_by_operator_blocks(code: str, max_chars: int):
                 flush_operator_block()
                 inside_operator = False
         else:
-            if current_length + len(line) > max_chars:
-                if current_chunk.strip():
-                    chunks.append(current_chunk.strip())
-                current_chunk = line
-                current_length = len(line)
-            else:
-                current_chunk += line
-                current_length += len(line)
+            add(line)
 
     if operator_block:
         flush_operator_block()
 
-    if current_chunk.strip():
-        chunks.append(current_chunk.strip())
+    if "".join(current_chunk).strip():
+        chunks.append("".join(current_chunk).strip())
 
     return chunks
 
+# Compound statements whose only statement list is `body`; these can be split
+# into "header + some body statements" chunks that still parse on their own.
+SPLITTABLE_NODES = (ast.With, ast.AsyncWith, ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef,
+                    ast.For, ast.AsyncFor, ast.While, ast.If)
+
+def _is_splittable(node):
+    if not isinstance(node, SPLITTABLE_NODES) or getattr(node, 'orelse', None):
+        return False
+    return node.body[0].lineno > node.lineno  # `with x: a = 1` on one line cannot be split
 
-def split_ast_with_operator_fallback(code: str, max_chars: int = 1200):
+def _statement_units(source, offsets, statements):
     """
-    Hybrid splitter:
-    - Splits Python code using AST node boundaries.
-    - If any AST block (like a DAG) is too large, falls back to splitting by operators.
+    Raw source of each statement (from the start of its first line, decorators
+    included) as [start, end, first_line, last_line, nodes]; statements that
+    share a line (a = 1; b = 2) form one unit.
     """
-    chunks = []
-    current_chunk = ""
-    current_length = 0
-
-    tree = ast.parse(code)
-    for node in tree.body:
-        block = ast.get_source_segment(code, node)
-        if not block:
-            continue
-
-        block = textwrap.dedent(block).strip()
-        block_with_space = block + "\n\n"
-
-        # Case 1: block is larger than max and needs operator fallback
-        if len(block_with_space) > max_chars:
-            if current_chunk:
-                chunks.append(current_chunk.strip())
-                current_chunk = ""
-                current_length = 0
-
-            # Split this long block by operator assignments
-            operator_chunks = split_by_operator_blocks(block_with_space, max_chars)
-            chunks.extend(operator_chunks)
-
-        # Case 2: fits in current chunk
-        elif current_length + len(block_with_space) <= max_chars:
-            current_chunk += block_with_space
-            current_chunk += "\n\n"
-            current_length += len(block_with_space)
-
-        # Case 3: fits in new chunk
+    units = []
+    for stmt in statements:
+        first = min([stmt] + getattr(stmt, 'decorator_list', []), key=lambda n: n.lineno)
+        end = offsets[stmt.end_lineno - 1] + stmt.end_col_offset
+        if units and first.lineno <= units[-1][3]:
+            units[-1][1] = end
+            units[-1][3] = stmt.end_lineno
+            units[-1][4].append(stmt)
         else:
-            if current_chunk:
-                chunks.append(current_chunk.strip())
-            current_chunk = block_with_space + "\n\n"
-            current_length = len(block_with_space)
+            units.append([offsets[first.lineno - 1], end, first.lineno, stmt.end_lineno, [stmt]])
+    return units
+
+def _parses(text):
+    try:
+        ast.parse(text)
+        return True
+    except SyntaxError:
+        return False
+
+def _split_node_raw(source, offsets, node, max_size, size_fn):
+    """[(raw_text, first_line, last_line)] with original indentation; None if the node cannot be split."""
+    if not _is_splittable(node):
+        return None
+    start_line = min([node] + getattr(node, 'decorator_list', []), key=lambda n: n.lineno).lineno
+    units = _statement_units(source, offsets, node.body)
+    header = source[offsets[start_line - 1]:units[0][0]].decode('utf-8')
+    body_budget = max_size - size_fn(header)
+    if body_budget <= 0:
+        return None
+
+    pieces = []
+    group = []
+    group_size = 0
+
+    def flush():
+        nonlocal group, group_size
+        if group:
+            body = "".join(text for text, _, _ in group)
+            pieces.append((header + body, group[0][1], group[-1][2]))
+        group = []
+        group_size = 0
+
+    for start, end, first_line, last_line, statements in units:
+        unit_text = source[start:end].decode('utf-8') + "\n"
+        unit_size = size_fn(unit_text)
+        if group and group_size + unit_size > body_budget:
+            flush()
+        if unit_size > body_budget and len(statements) == 1:
+            inner = _split_node_raw(source, offsets, statements[0], body_budget, size_fn)
+            if inner:
+                flush()
+                pieces.extend((header + text, first, last) for text, first, last in inner)
+                continue
+        group.append((unit_text, first_line, last_line))
+        group_size += unit_size
+    flush()
+    return pieces
+
+def split_oversized_node(source, offsets, node, max_size, size_fn=len):
+    """
+    Splits one oversized statement along its AST: a `with DAG(...)`, def, class,
+    loop or if keeps its header line(s) and gets as many body statements (task
+    assignments, nested blocks, ...) per chunk as fit in max_size; body
+    statements that are too large on their own are split recursively, wrapped
+    in the same headers. Every chunk parses on its own; a statement that cannot
+    be split (e.g. one huge call) is returned whole.
+    Returns a list of CodeChunk; spans cover the body statements a chunk carries.
+    """
+    text, start_line, end_line = node_source(source, offsets, node)
+    pieces = _split_node_raw(source, offsets, node, max_size, size_fn)
+    if not pieces:
+        return [CodeChunk(text, start_line, end_line)]
+    chunks = [CodeChunk(textwrap.dedent(raw).strip(), first, last) for raw, first, last in pieces]
+    if not all(_parses(chunk.text) for chunk in chunks):
+        return [CodeChunk(text, start_line, end_line)]
+    return chunks
 
-    if current_chunk:
-        chunks.append(current_chunk.strip())
+def iter_ast_chunks(code: str, max_size: int = 1200, size_fn=len, fallback="ast"):
+    """
+    Single-pass AST chunker.
+    Packs consecutive top-level nodes into chunks of at most max_size, where
+    size is measured by size_fn (len for characters, token_counter() for model
+    tokens). A node larger than max_size goes out on its own, split by
+    fallback: "ast" (split_oversized_node), "regex" (the older line-based
+    split_by_operator_blocks) or None (kept whole).
+    Yields CodeChunk(text, start_line, end_line).
+    """
+    source = code.encode('utf-8')
+    offsets = line_offsets(source)
+    separator_size = size_fn("\n\n")
 
-    return chunks
+    parts = []
+    parts_size = 0
+    first_line = last_line = None
 
+    for node in ast_cache.parse(code).body:
+        block, start_line, end_line = node_source(source, offsets, node)
+        if not block:
+            continue
+        block_size = size_fn(block) + separator_size
 
-chunks = split_ast_with_operator_fallback(code)
+        if parts and (parts_size + block_size > max_size or block_size > max_size):
+            yield CodeChunk("\n\n".join(parts), first_line, last_line)
+            parts = []
+            parts_size = 0
 
-for i, chunk in enumerate(chunks, 1):
-    chunk_name = f"chunk_{i}"
-    print(f"*****************CHUNK_NAME={chunk_name} AND CHUNK_LENGTH={len(chunk)}")
-    print(chunk)
+        if block_size > max_size and fallback == "ast":
+            yield from split_oversized_node(source, offsets, node, max_size, size_fn)
+            continue
+        if block_size > max_size and fallback == "regex":
+            for text in split_by_operator_blocks(block + "\n\n", max_size, size_fn):
+                yield CodeChunk(text, start_line, end_line)
+            continue
 
-print(f"*******************DONE************************")
+        if not parts:
+            first_line = start_line
+        parts.append(block)
+        parts_size += block_size
+        last_line = end_line
 
+    if parts:
+        yield CodeChunk("\n\n".join(parts), first_line, last_line)
 
+def split_ast_with_operator_fallback(code: str, max_chars: int = 1200, size_fn=len, fallback="ast"):
+    """
+    Hybrid splitter:
+    - Splits Python code using AST node boundaries.
+    - If any AST block (like a DAG) is too large, falls back to splitting it by
+      its body statements (operators, task groups, ...).
+    """
+    return [chunk.text for chunk in iter_ast_chunks(code, max_chars, size_fn, fallback)]
 
+def split_ast_code_blocks(code: str, max_chars: int = 1500):
+    """
+    Splits a Python file into chunks based on AST nodes,
+    ensuring each chunk is <= max_chars and syntactically valid.
+    """
+    return [chunk.text for chunk in iter_ast_chunks(code, max_chars, fallback=None)]
 
+if __name__ == "__main__":
+    import sys
+    with open(sys.argv[1], "r", encoding="utf-8") as f:
+        code = f.read()
 
+    for i, chunk in enumerate(iter_ast_chunks(code), 1):
+        chunk_name = f"chunk_{i}"
+        print(f"*****************CHUNK_NAME={chunk_name} AND CHUNK_LENGTH={len(chunk.text)} LINES={chunk.start_line}-{chunk.end_line}")
+        print(chunk.text)
 
+    print(f"*******************DONE************************")
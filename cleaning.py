@@ -1,53 +1,134 @@
 import re
 import tokenize
-import io
+import ast_cache
 
-def clean_and_split_multi_dag_file(full_code: str):
+SECTION_HEADER_PATTERN = re.compile(r"={5,}\s*\n\s*File:.*?\n\s*={5,}")
+# Whitespace that untokenize does not reproduce verbatim (it turns tabs and
+# form feeds between tokens into spaces and rewrites backslash continuations);
+# sources containing any of it take the untokenize path so results stay identical.
+IRREGULAR_WHITESPACE_PATTERN = re.compile(r"[\t\f]|\\\r?\n")
+TRIPLE_QUOTES = ("'''", '"""')
+
+def _is_dropped(tok, prev_toktype):
+    """Comments, docstrings (first string of a block) and triple-quoted block comments."""
+    if tok.type == tokenize.COMMENT:
+        return True
+    if tok.type == tokenize.STRING:
+        if prev_toktype == tokenize.INDENT:
+            return True  # Likely a docstring
+        if prev_toktype == tokenize.NEWLINE and tok.string.startswith(TRIPLE_QUOTES):
+            return True  # Likely a block comment
+    return False
+
+def _strip_lines(code):
+    """Removes empty lines and trailing spaces."""
+    return '\n'.join(line.rstrip() for line in code.splitlines() if line.strip())
+
+def untokenize_clean_py_code(code: str) -> str:
     """
-    - Splits a large Python file into multiple DAG sections based on header markers
-    - Removes comment blocks, docstrings, empty lines, and trailing spaces
-    - Returns a list of cleaned code blocks (one per DAG) with proper indentation
+    Removes comments and docstrings by rebuilding the kept tokens with
+    tokenize.untokenize. Slower than working_clean_py_code; used for sources
+    with tabs, form feeds or backslash continuations between tokens.
     """
+    output_tokens = []
+    prev_toktype = tokenize.INDENT
+
+    for tok in ast_cache.generate_tokens(code):
+        if _is_dropped(tok, prev_toktype):
+            continue
+        output_tokens.append(tok)
+        prev_toktype = tok.type
 
-    def working_clean_py_code(code: str) -> str:
-        output_tokens = []
-        prev_toktype = tokenize.INDENT
-        last_lineno = -1
-        last_col = 0
-
-        tokgen = tokenize.generate_tokens(io.StringIO(code).readline)
-
-        for tok in tokgen:
-            token_type = tok.type
-            token_string = tok.string
-            start_line, start_col = tok.start
-
-            if token_type == tokenize.COMMENT:
-                continue  # Remove single-line comments
-            elif token_type == tokenize.STRING:
-                if prev_toktype == tokenize.INDENT:
-                    continue  # Likely a docstring
-                elif prev_toktype == tokenize.NEWLINE and token_string.startswith(("'''", '\"\"\"')):
-                    continue  # Likely a block comment
-            output_tokens.append(tok)
-            prev_toktype = token_type
-            last_lineno, last_col = tok.end
-
-        # Reconstruct cleaned code with original spacing
-        cleaned_code = tokenize.untokenize(output_tokens)
-
-        # Remove empty lines and trim trailing spaces
-        cleaned_lines = [
-            line.rstrip() for line in cleaned_code.splitlines() if line.strip()
-        ]
-        return '\n'.join(cleaned_lines)
-
-    # Step 1: Split the file based on section headers
-    dag_blocks = re.split(r"={5,}\s*\n\s*File:.*?\n\s*={5,}", full_code)
-
-    cleaned_dags = []
-
-    for block in dag_blocks:
+    return _strip_lines(tokenize.untokenize(output_tokens))
+
+def _line_starts(code):
+    """Offset of every tokenize row (1-based; rows end at '\\n' only, as with StringIO.readline)."""
+    starts = [0, 0]
+    find = code.find
+    pos = find('\n')
+    while pos != -1:
+        starts.append(pos + 1)
+        pos = find('\n', pos + 1)
+    return starts
+
+def _drop_span(code, starts, pieces, pos, dropped, next_tok, startline):
+    """
+    Appends the source from pos up to next_tok with the dropped tokens removed
+    and returns the new position. Output matches untokenize: when a dropped
+    string spans several lines, untokenize bridges the rows with backslash
+    continuation lines, so those are reproduced here.
+    """
+    row, col = dropped[0].start
+    next_row, next_col = next_tok.start
+    at_line_end = next_tok.type in (tokenize.NEWLINE, tokenize.NL, tokenize.ENDMARKER)
+
+    if next_row == row:
+        for tok in dropped:
+            pieces.append(code[pos:starts[row] + tok.start[1]])
+            if not at_line_end:
+                pieces.append(" " * (tok.end[1] - tok.start[1]))  # keep the next token's column
+            pos = starts[row] + tok.end[1]
+        return pos
+
+    # A multi-line string dropped at the start of its line (docstrings and block
+    # comments always are): untokenize re-indents a following token on the same
+    # line, then emits one "\\" line per row the string covered.
+    pieces.append(code[pos:starts[row]])
+    if next_tok.type == tokenize.ENDMARKER:
+        return starts[row]
+    indent = " " * col if startline and col and not at_line_end and next_col >= col else ""
+    pieces.append(indent + "\\\n" * (next_row - row) + " " * next_col)
+    return starts[next_row] + next_col
+
+def working_clean_py_code(code: str) -> str:
+    """
+    Removes comments and docstrings from Python source.
+    Tokens come from the shared ast_cache, so each block is tokenized only once.
+    Only the spans of dropped tokens are recorded; the result is built in one
+    join over the original source, without an untokenize round trip.
+    """
+    if IRREGULAR_WHITESPACE_PATTERN.search(code):
+        return untokenize_clean_py_code(code)
+
+    tokens = ast_cache.generate_tokens(code)
+    starts = _line_starts(code)
+    pieces = []
+    pos = 0
+    dropped = []
+    prev_toktype = tokenize.INDENT
+    startline = False  # whether the last token written out ended a line, as untokenize tracks it
+
+    for tok in tokens:
+        token_type = tok.type
+        if _is_dropped(tok, prev_toktype):
+            dropped.append(tok)
+            continue
+        if dropped:
+            pos = _drop_span(code, starts, pieces, pos, dropped, tok, startline)
+            dropped = []
+        prev_toktype = token_type
+        if token_type != tokenize.INDENT and token_type != tokenize.DEDENT:
+            startline = token_type == tokenize.NEWLINE or token_type == tokenize.NL
+    pieces.append(code[pos:])
+
+    return _strip_lines("".join(pieces))
+
+def iter_sections(full_code: str):
+    """Raw text between File: section headers, one section at a time (same pieces as re.split)."""
+    start = 0
+    for match in SECTION_HEADER_PATTERN.finditer(full_code):
+        yield full_code[start:match.start()]
+        start = match.end()
+    yield full_code[start:]
+
+def iter_clean_dag_sections(full_code: str):
+    """
+    - Walks a large Python file section by section, based on header markers
+    - Removes comment blocks, docstrings, empty lines, and trailing spaces
+    - Yields one cleaned code block per DAG with proper indentation, so the
+      cleaned blocks of a large dump are never all held at once
+    """
+    for block in iter_sections(full_code):
         if not block.strip():
             continue
 
@@ -60,7 +141,12 @@ def clean_and_split_multi_dag_file(full_code: str):
         cleaned_block = '\n'.join(lines[lines_to_skip:])
 
         # Clean the DAG code block and preserve indentation
-        final_cleaned = working_clean_py_code(cleaned_block)
-        cleaned_dags.append(final_cleaned)
+        yield working_clean_py_code(cleaned_block)
 
-    return cleaned_dags
+def clean_and_split_multi_dag_file(full_code: str):
+    """
+    - Splits a large Python file into multiple DAG sections based on header markers
+    - Removes comment blocks, docstrings, empty lines, and trailing spaces
+    - Returns a list of cleaned code blocks (one per DAG) with proper indentation
+    """
+    return list(iter_clean_dag_sections(full_code))
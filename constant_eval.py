@@ -0,0 +1,316 @@
+import ast
+import operator
+import os
+import re
+import string
+import ast_cache
+
+BINARY_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+}
+UNARY_OPERATORS = {ast.USub: operator.neg, ast.UAdd: operator.pos, ast.Not: operator.not_}
+PATH_JOIN_CALLS = {"os.path.join", "path.join", "posixpath.join"}
+ENV_CALLS = {"os.getenv", "getenv", "os.environ.get", "environ.get"}
+MUTATING_METHODS = {"update", "append", "extend", "insert", "pop", "popitem", "remove", "clear", "setdefault",
+                    "add", "discard", "sort", "reverse"}
+MAX_VALUE_LENGTH = 100000  # "x" * 10**9 in a config must not blow up the resolver
+
+class Unresolved(Exception):
+    """The value of an expression cannot be known without running the code."""
+
+class Namespace(dict):
+    """Constants of an imported module, bound to its name (config.TABLE resolves through it)."""
+
+def dotted_name(node):
+    """'os.path.join' for the node of os.path.join, None for anything but names and attributes."""
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if not isinstance(node, ast.Name):
+        return None
+    parts.append(node.id)
+    return '.'.join(reversed(parts))
+
+def _checked(value):
+    if isinstance(value, (str, bytes, list, tuple)) and len(value) > MAX_VALUE_LENGTH:
+        raise Unresolved("value too large")
+    return value
+
+def _check_format_spec(spec):
+    # a width or precision like {x:>1000000000} would build the huge string before _checked sees it
+    if any(int(digits) > MAX_VALUE_LENGTH for digits in re.findall(r'\d+', spec)):
+        raise Unresolved("value too large")
+
+def format_value(node, scope):
+    """Text of one f-string field ({value!r:>10} and the like)."""
+    value = evaluate(node.value, scope)
+    if node.conversion == ord('r'):
+        value = repr(value)
+    elif node.conversion == ord('s'):
+        value = str(value)
+    elif node.conversion == ord('a'):
+        value = ascii(value)
+    spec = evaluate(node.format_spec, scope) if node.format_spec else ''
+    _check_format_spec(spec)
+    try:
+        return format(value, spec)
+    except (TypeError, ValueError) as e:
+        raise Unresolved(str(e))
+
+def _evaluate_call(node, scope):
+    name = dotted_name(node.func)
+    if any(isinstance(arg, ast.Starred) for arg in node.args):
+        raise Unresolved("starred argument")
+    if name in PATH_JOIN_CALLS:
+        parts = [evaluate(arg, scope) for arg in node.args]
+        if not parts or not all(isinstance(part, str) for part in parts):
+            raise Unresolved("os.path.join of non-strings")
+        return os.path.join(*parts)
+    if name in ENV_CALLS:
+        # The environment of the analysis host is not the DAG's; the default is
+        # what an import outside Composer would have produced too.
+        if len(node.args) < 2:
+            raise Unresolved("environment variable without default")
+        return evaluate(node.args[1], scope)
+    if isinstance(node.func, ast.Attribute) and node.func.attr in ('format', 'join', 'upper', 'lower', 'strip'):
+        target = evaluate(node.func.value, scope)
+        if not isinstance(target, str):
+            raise Unresolved("string method on a non-string")
+        args = [evaluate(arg, scope) for arg in node.args]
+        try:
+            if node.func.attr == 'format':
+                for _, _, spec, _ in string.Formatter().parse(target):
+                    _check_format_spec(spec or '')
+            kwargs = {}
+            for keyword in node.keywords:
+                if keyword.arg is None:
+                    kwargs.update(evaluate(keyword.value, scope))
+                else:
+                    kwargs[keyword.arg] = evaluate(keyword.value, scope)
+            return _checked(getattr(target, node.func.attr)(*args, **kwargs))
+        except (IndexError, KeyError, TypeError, ValueError) as e:
+            raise Unresolved(str(e))
+    raise Unresolved(f"call to {name}")
+
+def evaluate(node, scope):
+    """
+    Value of an expression built from literals, names in scope (a dict),
+    f-strings, + - * / // %, containers, subscripts, attributes of imported
+    modules (Namespace), os.path.join, str.format / join / upper / lower /
+    strip and os.getenv / os.environ.get with a default.
+    Raises Unresolved for anything else; nothing is ever executed.
+    """
+    if isinstance(node, ast.Constant):
+        return node.value
+    if isinstance(node, ast.Name):
+        if node.id in scope:
+            return scope[node.id]
+        raise Unresolved(f"unknown name {node.id}")
+    if isinstance(node, ast.JoinedStr):
+        return "".join(value.value if isinstance(value, ast.Constant) else format_value(value, scope)
+                       for value in node.values)
+    if isinstance(node, ast.BinOp) and type(node.op) in BINARY_OPERATORS:
+        left, right = evaluate(node.left, scope), evaluate(node.right, scope)
+        if isinstance(node.op, ast.Mult):
+            sequence, count = (right, left) if isinstance(left, int) else (left, right)
+            if isinstance(sequence, (str, bytes, list, tuple)) and isinstance(count, int) \
+                    and len(sequence) * count > MAX_VALUE_LENGTH:
+                raise Unresolved("value too large")
+        try:
+            return _checked(BINARY_OPERATORS[type(node.op)](left, right))
+        except (TypeError, ValueError, ZeroDivisionError, KeyError) as e:
+            raise Unresolved(str(e))
+    if isinstance(node, ast.UnaryOp) and type(node.op) in UNARY_OPERATORS:
+        try:
+            return UNARY_OPERATORS[type(node.op)](evaluate(node.operand, scope))
+        except TypeError as e:
+            raise Unresolved(str(e))
+    if isinstance(node, (ast.List, ast.Tuple, ast.Set)):
+        if any(isinstance(elt, ast.Starred) for elt in node.elts):
+            raise Unresolved("starred element")
+        values = [evaluate(elt, scope) for elt in node.elts]
+        if isinstance(node, ast.Tuple):
+            return tuple(values)
+        try:
+            return set(values) if isinstance(node, ast.Set) else values
+        except TypeError as e:
+            raise Unresolved(str(e))
+    if isinstance(node, ast.Dict):
+        result = {}
+        try:
+            for key, value in zip(node.keys, node.values):
+                if key is None:
+                    result.update(evaluate(value, scope))
+                else:
+                    result[evaluate(key, scope)] = evaluate(value, scope)
+        except (TypeError, ValueError) as e:
+            raise Unresolved(str(e))
+        return result
+    if isinstance(node, ast.Subscript):
+        container = evaluate(node.value, scope)
+        key = evaluate(node.slice, scope) if not isinstance(node.slice, ast.Slice) else slice(
+            *[evaluate(part, scope) if part is not None else None
+              for part in (node.slice.lower, node.slice.upper, node.slice.step)])
+        try:
+            return container[key]
+        except (IndexError, KeyError, TypeError) as e:
+            raise Unresolved(str(e))
+    if isinstance(node, ast.Attribute):
+        namespace = evaluate(node.value, scope)
+        if isinstance(namespace, Namespace) and node.attr in namespace:
+            return namespace[node.attr]
+        raise Unresolved(f"unknown attribute {node.attr}")
+    if isinstance(node, ast.Call):
+        return _evaluate_call(node, scope)
+    raise Unresolved(type(node).__name__)
+
+def _assign(target, value, scope):
+    if isinstance(target, ast.Name):
+        scope[target.id] = value
+    elif isinstance(target, (ast.Tuple, ast.List)) and isinstance(value, (tuple, list)) \
+            and len(target.elts) == len(value):
+        for elt, item in zip(target.elts, value):
+            _assign(elt, item, scope)
+    elif isinstance(target, ast.Subscript) and isinstance(target.value, ast.Name) \
+            and not isinstance(target.slice, ast.Slice):
+        # CONFIG['key'] = ...; the container is copied, never changed in place,
+        # because it may be shared with another branch or an importing module
+        container = evaluate(target.value, scope)
+        if not isinstance(container, (dict, list)):
+            raise Unresolved("item assignment on a non-container")
+        container = type(container)(container) if not isinstance(container, Namespace) else dict(container)
+        try:
+            container[evaluate(target.slice, scope)] = value
+        except (IndexError, TypeError) as e:
+            raise Unresolved(str(e))
+        scope[target.value.id] = container
+    else:
+        raise Unresolved("unsupported assignment target")
+
+def _forget(target, scope):
+    if isinstance(target, (ast.Tuple, ast.List)):
+        for elt in target.elts:
+            _forget(elt, scope)
+        return
+    while isinstance(target, (ast.Subscript, ast.Attribute, ast.Starred)):
+        target = target.value  # CONFIG['key'] = <unknown> makes all of CONFIG unknown
+    if isinstance(target, ast.Name):
+        scope.pop(target.id, None)
+
+def _merge_branches(scope, branches):
+    """Keeps in scope only the names every branch leaves with the same value."""
+    names = set(scope)
+    for branch in branches:
+        names |= set(branch)
+    for name in names:
+        values = [branch.get(name, _MISSING) for branch in branches]
+        if values[0] is not _MISSING and all(same_value(values[0], value) for value in values[1:]):
+            scope[name] = values[0]
+        else:
+            scope.pop(name, None)
+
+def same_value(a, b):
+    """Equality that never raises and does not treat 1 and True (or 1 and 1.0) as the same constant."""
+    try:
+        return a is b or (type(a) is type(b) and a == b)
+    except Exception:
+        return False
+
+_MISSING = object()
+
+def constants_from_statements(statements, scope=None, on_import=None):
+    """
+    Runs the assignments of a statement list (a module or function body) through
+    evaluate, in order. Names whose value cannot be resolved are dropped, so a
+    later unresolvable reassignment never leaves a stale value behind.
+    with blocks are followed; if / try / loop bodies keep only the names all
+    paths agree on. Functions and classes defined here shadow constants of the
+    same name. Import statements are passed to on_import(stmt, scope), if given.
+    """
+    scope = {} if scope is None else scope
+    for stmt in statements:
+        if isinstance(stmt, ast.Assign):
+            targets, value_node = stmt.targets, stmt.value
+        elif isinstance(stmt, ast.AnnAssign) and stmt.value is not None:
+            targets, value_node = [stmt.target], stmt.value
+        elif isinstance(stmt, ast.AugAssign):
+            targets, value_node = [stmt.target], ast.BinOp(stmt.target, stmt.op, stmt.value)
+        elif isinstance(stmt, (ast.Import, ast.ImportFrom)):
+            if on_import:
+                on_import(stmt, scope)
+            else:
+                for alias in stmt.names:
+                    scope.pop((alias.asname or alias.name).split('.')[0], None)
+            continue
+        elif isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            scope.pop(stmt.name, None)
+            continue
+        elif isinstance(stmt, (ast.With, ast.AsyncWith)):
+            for item in stmt.items:
+                if item.optional_vars is not None:
+                    _forget(item.optional_vars, scope)
+            constants_from_statements(stmt.body, scope, on_import)
+            continue
+        elif isinstance(stmt, ast.If):
+            branches = [constants_from_statements(body, dict(scope), on_import) for body in (stmt.body, stmt.orelse)]
+            _merge_branches(scope, branches)
+            continue
+        elif isinstance(stmt, (ast.For, ast.AsyncFor, ast.While)):
+            loop_scope = dict(scope)
+            if not isinstance(stmt, ast.While):
+                _forget(stmt.target, loop_scope)
+            constants_from_statements(stmt.body, loop_scope, on_import)
+            constants_from_statements(stmt.orelse, loop_scope, on_import)
+            _merge_branches(scope, [loop_scope, dict(scope)])
+            continue
+        elif isinstance(stmt, ast.Try):
+            branches = [constants_from_statements(stmt.body + stmt.orelse, dict(scope), on_import)]
+            for handler in stmt.handlers:
+                handler_scope = dict(scope)
+                if handler.name:
+                    handler_scope.pop(handler.name, None)
+                branches.append(constants_from_statements(handler.body, handler_scope, on_import))
+            _merge_branches(scope, branches)
+            constants_from_statements(stmt.finalbody, scope, on_import)
+            continue
+        elif isinstance(stmt, ast.Delete):
+            for target in stmt.targets:
+                _forget(target, scope)
+            continue
+        elif isinstance(stmt, ast.Expr) and isinstance(stmt.value, ast.Call) \
+                and isinstance(stmt.value.func, ast.Attribute) and stmt.value.func.attr in MUTATING_METHODS:
+            _forget(stmt.value.func.value, scope)  # CONFIG.update(...) changes CONFIG in place
+            continue
+        else:
+            continue
+        try:
+            value = evaluate(value_node, scope)
+            for target in targets:
+                _assign(target, value, scope)
+        except Unresolved:
+            for target in targets:
+                _forget(target, scope)
+    return scope
+
+def _module_constants(source):
+    try:
+        tree = ast_cache.parse(source)
+    except (SyntaxError, ValueError):
+        return {}
+    return constants_from_statements(tree.body)
+
+_constants_cache = ast_cache.LRUCache()
+
+def module_constants(source: str) -> dict:
+    """
+    {name: value} of the module-level constants of a source, evaluated statically.
+    Imports are not followed (see constant_propagation.ModuleScopes for that).
+    Cached per content hash; the returned dict is shared and must not be modified.
+    """
+    return _constants_cache.get_or_compute(source, _module_constants)
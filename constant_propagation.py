@@ -0,0 +1,296 @@
+import ast
+import posixpath
+import re
+import ast_cache
+from constant_eval import Namespace, Unresolved, _forget, constants_from_statements, format_value, same_value
+from module_index import ModuleIndex
+
+# {{ params.VAR }} / {{ VAR }}, ${VAR}, {VAR}, <VAR> and #VAR# placeholders in SQL text
+PLACEHOLDER_PATTERN = re.compile(
+    r"\{\{\s*(?:params\.)?(?P<jinja>\w+)\s*\}\}"
+    r"|\$\{\s*(?P<shell>\w+)\s*\}"
+    r"|\{(?P<format>\w+)\}"
+    r"|<(?P<angle>\w+)>"
+    r"|#(?P<hash>\w+)#"
+)
+
+def placeholder_values(values):
+    """
+    Names a placeholder can refer to: the scope's own names, then the names of
+    modules it imports (import config as cfg makes <TABLE> mean cfg.TABLE)
+    where those modules agree.
+    """
+    lookup = {}
+    conflicts = set()
+    for value in values.values():
+        if isinstance(value, Namespace):
+            for name, item in value.items():
+                if name in lookup and not same_value(lookup[name], item):
+                    conflicts.add(name)
+                lookup.setdefault(name, item)
+    for name in conflicts:
+        del lookup[name]
+    lookup.update(values)
+    return lookup
+
+def substitute_placeholders(text, values):
+    """Replaces the placeholders whose name has a known str / number value; others are left as they are."""
+    if not values:
+        return text
+    values = placeholder_values(values)
+
+    def replace(match):
+        value = values.get(match.group(match.lastgroup))
+        if isinstance(value, (str, int, float)) and not isinstance(value, bool):
+            return str(value)
+        return match.group()
+
+    return PLACEHOLDER_PATTERN.sub(replace, text)
+
+def render_fstring(node, scope, unknown):
+    """Text of an f-string with known fields filled in; unknown(field) renders the others."""
+    parts = []
+    for value in node.values:
+        if isinstance(value, ast.Constant):
+            parts.append(str(value.value))
+            continue
+        try:
+            parts.append(format_value(value, scope))
+        except Unresolved:
+            parts.append(unknown(value))
+    return "".join(parts)
+
+def shared_values(scopes):
+    """Names bound to the same value in every scope, e.g. for a SQL file used by several DAGs."""
+    scopes = list(scopes)
+    if not scopes:
+        return {}
+    first, rest = scopes[0], scopes[1:]
+    return {name: value for name, value in first.items()
+            if all(name in other and same_value(other[name], value) for other in rest)}
+
+TRY_NODES = (ast.Try,) + ((ast.TryStar,) if hasattr(ast, 'TryStar') else ())
+MATCH_CASE_NODES = (ast.match_case,) if hasattr(ast, 'match_case') else ()
+
+def local_names(statements):
+    """Names a function body binds (assignments, imports, defs, loop / with / except targets), not nested scopes."""
+    names = set()
+    pending = list(statements)
+    while pending:
+        node = pending.pop()
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(node.name)
+            pending.extend(node.decorator_list)
+            continue
+        if isinstance(node, (ast.Lambda, ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)):
+            continue
+        if isinstance(node, ast.Name) and isinstance(node.ctx, (ast.Store, ast.Del)):
+            names.add(node.id)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            names.update((alias.asname or alias.name).split('.')[0] for alias in node.names if alias.name != '*')
+        elif isinstance(node, ast.ExceptHandler) and node.name:
+            names.add(node.name)
+        elif isinstance(node, (ast.Global, ast.Nonlocal)):
+            names.difference_update(node.names)
+        pending.extend(ast.iter_child_nodes(node))
+    return names
+
+class ModuleScopes:
+    """
+    Constant propagation over a repo snapshot ({path: content}).
+    module_scope(path) is every name a module binds to a statically known value,
+    following imports of other repo modules (from config import TABLE,
+    import config as cfg, from config import *, relative imports);
+    function_scope adds a function's own constants. Each module is evaluated in
+    one pass and memoized for the lifetime of the object, so thousands of DAGs
+    importing the same config cost one evaluation of it.
+    Scopes are shared and must not be modified.
+    """
+
+    def __init__(self, file_lookup_map, module_index=None):
+        self.file_lookup_map = file_lookup_map
+        self.module_index = module_index if module_index is not None else ModuleIndex(file_lookup_map)
+        self._module_scopes = {}
+        self._function_scopes = {}
+
+    def module_scope(self, path):
+        scope = self._module_scopes.get(path)
+        if scope is not None:
+            return scope
+        self._module_scopes[path] = Namespace()  # an import cycle sees the module as empty
+        try:
+            tree = ast_cache.parse(self.file_lookup_map[path])
+        except (KeyError, SyntaxError, ValueError):
+            return self._module_scopes[path]
+        scope = constants_from_statements(tree.body, Namespace(), self._import_hook(path))
+        self._module_scopes[path] = scope
+        return scope
+
+    def function_scope(self, path, node, enclosing=None):
+        """
+        Scope at the end of a def of module path; enclosing is the final scope of
+        what the def sits in (the module's by default).
+        """
+        key = (path, node.lineno, node.col_offset)
+        scope = self._function_scopes.get(key)
+        if scope is not None:
+            return scope
+        scope = constants_from_statements(node.body, self.function_entry(path, node, enclosing),
+                                          self._import_hook(path))
+        self._function_scopes[key] = scope
+        return scope
+
+    def function_entry(self, path, node, enclosing=None):
+        """
+        Scope at the first statement of a def: the enclosing names (seen as they
+        are once the module has run) without the parameters and without the
+        names the body binds itself, which are local from the start.
+        """
+        scope = dict(self.module_scope(path) if enclosing is None else enclosing)
+        args = node.args
+        for arg in args.posonlyargs + args.args + args.kwonlyargs + [args.vararg, args.kwarg]:
+            if arg is not None:
+                scope.pop(arg.arg, None)
+        for name in local_names(node.body):
+            scope.pop(name, None)
+        return scope
+
+    def _import_hook(self, path):
+        return lambda stmt, scope: self._bind_import(path, stmt, scope)
+
+    def _resolve(self, path, module_name, level):
+        """Repo path of an imported module, or None for modules outside the repo."""
+        if not level:
+            return self.module_index.lookup(module_name)
+        base = posixpath.dirname(path)
+        for _ in range(level - 1):
+            base = posixpath.dirname(base)
+        target = posixpath.join(base, *module_name.split('.')) if module_name else base
+        for candidate in (target + '.py', posixpath.join(target, '__init__.py')):
+            if candidate in self.file_lookup_map:
+                return candidate
+        return None
+
+    def _bind_import(self, path, stmt, scope):
+        if isinstance(stmt, ast.Import):
+            for alias in stmt.names:
+                bound = alias.asname or alias.name
+                module_path = self._resolve(path, alias.name, 0) if alias.asname or '.' not in alias.name else None
+                if module_path is not None:
+                    scope[bound] = self.module_scope(module_path)
+                else:
+                    scope.pop(bound.split('.')[0], None)
+            return
+
+        module_path = self._resolve(path, stmt.module, stmt.level)
+        module = self.module_scope(module_path) if module_path is not None else None
+        for alias in stmt.names:
+            if alias.name == '*':
+                if module is not None:
+                    scope.update((name, value) for name, value in module.items() if not name.startswith('_'))
+                continue
+            bound = alias.asname or alias.name
+            if module is not None and alias.name in module:
+                scope[bound] = module[alias.name]
+                continue
+            # from package import submodule
+            submodule = f"{stmt.module}.{alias.name}" if stmt.module else alias.name
+            submodule_path = self._resolve(path, submodule, stmt.level)
+            if submodule_path is not None:
+                scope[bound] = self.module_scope(submodule_path)
+            else:
+                scope.pop(bound, None)
+
+class OrderedScopeVisitor(ast.NodeVisitor):
+    """
+    NodeVisitor whose variable_map follows statement order: every node is
+    visited with the names bound to known values at that point of the file, so
+    a name assigned twice resolves to the first value before the second
+    assignment. Bodies of if / try / loops start from what all paths into them
+    agree on; a def body starts from the final values of the module (see
+    ModuleScopes.function_entry). Subclasses set self.scopes (a ModuleScopes)
+    and self.current_file and visit the module's tree, or use visit_function_body.
+    """
+
+    variable_map = {}
+    _enclosing = ()  # final scopes of the module / defs being visited, innermost last
+
+    def visit_function_body(self, node, enclosing=None):
+        """Visits the statements of a def of current_file, as when the def is reached by a visit."""
+        self._visit_body(node.body, self.scopes.function_entry(self.current_file, node, enclosing),
+                         self.scopes.function_scope(self.current_file, node, enclosing))
+
+    def generic_visit(self, node):
+        if isinstance(node, ast.Module):
+            self._visit_body(node.body, Namespace(), self.scopes.module_scope(self.current_file))
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            self._visit_children(node, skip=('body',))
+            self.visit_function_body(node, self._enclosing[-1] if self._enclosing else None)
+        elif isinstance(node, ast.ClassDef):
+            self._visit_children(node, skip=('body',))
+            self._visit_body(node.body, dict(self.variable_map))  # methods see the module, not the class body
+        elif isinstance(node, (ast.With, ast.AsyncWith)):
+            self._visit_children(node, skip=('body',))
+            scope = dict(self.variable_map)
+            for item in node.items:
+                if item.optional_vars is not None:
+                    _forget(item.optional_vars, scope)
+            self._visit_body(node.body, scope)
+        elif isinstance(node, ast.If):
+            self.visit(node.test)
+            self._visit_body(node.body, dict(self.variable_map))
+            self._visit_body(node.orelse, dict(self.variable_map))
+        elif isinstance(node, (ast.For, ast.AsyncFor, ast.While)):
+            self._visit_children(node, skip=('body', 'orelse'))
+            # names a pass through the loop changes are unknown inside it
+            scope = self._after(node, dict(self.variable_map))
+            if not isinstance(node, ast.While):
+                _forget(node.target, scope)
+            self._visit_body(node.body, scope)
+            self._visit_body(node.orelse, dict(scope))
+        elif isinstance(node, TRY_NODES):
+            outer = self.variable_map
+            end_of_body = self._visit_body(node.body, dict(outer))
+            self._visit_body(node.orelse, end_of_body)
+            unchanged = {name: value for name, value in outer.items()
+                         if name in end_of_body and same_value(end_of_body[name], value)}
+            for handler in node.handlers:
+                if handler.type is not None:
+                    self.visit(handler.type)
+                scope = dict(unchanged)
+                if handler.name:
+                    scope.pop(handler.name, None)
+                self._visit_body(handler.body, scope)
+            after = self._after(ast.Try(body=node.body, handlers=node.handlers, orelse=node.orelse, finalbody=[]),
+                                dict(outer))
+            self._visit_body(node.finalbody, after)
+        elif isinstance(node, MATCH_CASE_NODES):
+            self._visit_children(node, skip=('body',))
+            self._visit_body(node.body, dict(self.variable_map))
+        else:
+            super().generic_visit(node)
+
+    def _visit_children(self, node, skip):
+        for field, value in ast.iter_fields(node):
+            if field in skip:
+                continue
+            for item in value if isinstance(value, list) else [value]:
+                if isinstance(item, ast.AST):
+                    self.visit(item)
+
+    def _after(self, stmt, scope):
+        return constants_from_statements([stmt], scope, self.scopes._import_hook(self.current_file))
+
+    def _visit_body(self, statements, scope, final=None):
+        """Visits statements with scope (owned by this call) updated after each one; returns it."""
+        outer, enclosing = self.variable_map, self._enclosing
+        if final is not None:
+            self._enclosing = enclosing + (final,)
+        try:
+            for stmt in statements:
+                self.variable_map = scope
+                self.visit(stmt)
+                self._after(stmt, scope)
+        finally:
+            self.variable_map, self._enclosing = outer, enclosing
+        return scope
@@ -0,0 +1,146 @@
+import difflib
+import re
+import zlib
+from collections import defaultdict
+import numpy as np
+from cleaning import clean_and_split_multi_dag_file
+
+NUM_PERM = 128
+SHINGLE_SIZE = 5
+THRESHOLD = 0.8
+MERSENNE_PRIME = (1 << 61) - 1
+TOKEN_PATTERN = re.compile(r"""
+    (?P<string>[rRbBfFuU]{0,2}(?:'(?:[^'\\\n]|\\.)*'|"(?:[^"\\\n]|\\.)*"))
+  | (?P<number>\d[\w.]*)
+  | \w+ | [^\w\s]
+""", re.VERBOSE)
+
+_rng = np.random.RandomState(1)  # fixed seed: signatures must be comparable across runs
+PERM_A = _rng.randint(1, 1 << 31, size=NUM_PERM, dtype=np.uint64)
+PERM_B = _rng.randint(0, 1 << 31, size=NUM_PERM, dtype=np.uint64)
+
+def tokenize_for_shingles(code, mask_literals=True):
+    """
+    Code tokens; with mask_literals, string and number literals become STR / NUM
+    so template copies that only differ in their parameters look identical.
+    """
+    tokens = []
+    for match in TOKEN_PATTERN.finditer(code):
+        kind = match.lastgroup
+        if mask_literals and kind == 'string':
+            tokens.append("STR")
+        elif mask_literals and kind == 'number':
+            tokens.append("NUM")
+        else:
+            tokens.append(match.group())
+    return tokens
+
+def shingles(code, size=SHINGLE_SIZE, mask_literals=True):
+    """Set of 32-bit hashes of every run of `size` consecutive tokens."""
+    tokens = tokenize_for_shingles(code, mask_literals)
+    if len(tokens) < size:
+        return {zlib.crc32(" ".join(tokens).encode('utf-8'))}
+    return {zlib.crc32("\0".join(tokens[i:i + size]).encode('utf-8')) for i in range(len(tokens) - size + 1)}
+
+def minhash_signature(shingle_hashes, num_perm=NUM_PERM):
+    """MinHash over (a*x + b) mod p permutations, computed for all shingles at once."""
+    values = np.fromiter(shingle_hashes, dtype=np.uint64, count=len(shingle_hashes))
+    # a, x < 2^32 and b < 2^31, so a*x + b cannot overflow uint64
+    hashed = (np.outer(values, PERM_A[:num_perm]) + PERM_B[:num_perm]) % np.uint64(MERSENNE_PRIME)
+    return hashed.min(axis=0)
+
+def lsh_params(threshold, num_perm=NUM_PERM):
+    """(bands, rows) whose LSH threshold (1/b)^(1/r) is closest below the target, to favour recall."""
+    best = None
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        lsh_threshold = (1 / bands) ** (1 / rows)
+        if lsh_threshold <= threshold and (best is None or lsh_threshold > best[2]):
+            best = (bands, rows, lsh_threshold)
+    return best[:2] if best else (num_perm, 1)
+
+def estimated_similarity(sig_a, sig_b):
+    return float(np.mean(sig_a == sig_b))
+
+class _UnionFind:
+    def __init__(self, size):
+        self.parent = list(range(size))
+
+    def find(self, i):
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i, j):
+        root_i, root_j = self.find(i), self.find(j)
+        if root_i != root_j:
+            # the lower index stays root, so the earliest DAG represents the cluster
+            self.parent[max(root_i, root_j)] = min(root_i, root_j)
+
+def dedup_dags(dag_blocks, threshold=THRESHOLD, num_perm=NUM_PERM, shingle_size=SHINGLE_SIZE, mask_literals=True,
+               with_diffs=True):
+    """
+    Groups near-duplicate DAGs (template copies with different parameters).
+    dag_blocks is a list of cleaned DAG sources (e.g. from
+    clean_and_split_multi_dag_file) or a {name: source} dict.
+
+    Similarity is Jaccard over token shingles with string/number literals
+    masked (mask_literals=False compares literals too). Every DAG is hashed
+    into LSH buckets once; within a bucket each member is compared against the
+    bucket's first DAG only, so the work stays roughly linear. Pairs whose
+    estimated similarity reaches threshold are merged.
+
+    Returns one dict per cluster, largest first:
+    {"representative": name, "members": [names], "similarity": {name: estimate},
+     "diffs": {name: unified diff against the representative}}
+    Only the representative needs full analysis; the diffs show what the other
+    members change (task ids, table names, schedules, ...).
+    """
+    if isinstance(dag_blocks, dict):
+        names, sources = list(dag_blocks.keys()), list(dag_blocks.values())
+    else:
+        names, sources = list(range(len(dag_blocks))), list(dag_blocks)
+
+    signatures = [minhash_signature(shingles(source, shingle_size, mask_literals), num_perm) for source in sources]
+    bands, rows = lsh_params(threshold, num_perm)
+
+    union_find = _UnionFind(len(sources))
+    for band in range(bands):
+        buckets = defaultdict(list)
+        for i, signature in enumerate(signatures):
+            buckets[signature[band * rows:(band + 1) * rows].tobytes()].append(i)
+        for members in buckets.values():
+            first = members[0]
+            for other in members[1:]:
+                if union_find.find(other) != union_find.find(first) and \
+                        estimated_similarity(signatures[first], signatures[other]) >= threshold:
+                    union_find.union(first, other)
+
+    groups = defaultdict(list)
+    for i in range(len(sources)):
+        groups[union_find.find(i)].append(i)
+
+    clusters = []
+    for root, members in groups.items():
+        cluster = {
+            "representative": names[root],
+            "members": [names[i] for i in members],
+            "similarity": {names[i]: estimated_similarity(signatures[root], signatures[i]) for i in members if i != root},
+            "diffs": {}
+        }
+        if with_diffs:
+            base = sources[root].splitlines()
+            for i in members:
+                if i != root:
+                    diff = difflib.unified_diff(base, sources[i].splitlines(), str(names[root]), str(names[i]), n=0, lineterm='')
+                    cluster["diffs"][names[i]] = '\n'.join(diff)
+        clusters.append(cluster)
+    clusters.sort(key=lambda cluster: -len(cluster["members"]))
+    return clusters
+
+def dedup_multi_dag_file(full_code, threshold=THRESHOLD, **kwargs):
+    """Splits and cleans a multi-DAG dump (File: sections) and clusters its DAGs."""
+    return dedup_dags(clean_and_split_multi_dag_file(full_code), threshold, **kwargs)
@@ -1,15 +1,191 @@
 import ast
 import os
+import multiprocessing
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import ast_cache
+from constant_eval import Unresolved, evaluate
+from constant_propagation import ModuleScopes, OrderedScopeVisitor, render_fstring
+from module_index import ModuleIndex
 
-class GeneralDependencyExtractor(ast.NodeVisitor):
-    def __init__(self, file_lookup_map):
+# dependencies: paths referenced; source_files: repo files read; calls: (path, class, method) reached
+MethodSummary = namedtuple("MethodSummary", ["dependencies", "source_files", "calls"])
+
+EMPTY_SUMMARY = MethodSummary(frozenset(), frozenset(), ())
+
+def _class_table(source):
+    """{class_name: ({method_name: def node}, [base names])} of a module; first definition wins."""
+    try:
+        tree = ast_cache.parse(source)
+    except (SyntaxError, ValueError):
+        return {}
+    classes = {}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ClassDef) and node.name not in classes:
+            methods = {item.name: item for item in node.body if isinstance(item, ast.FunctionDef)}
+            bases = [base.attr if isinstance(base, ast.Attribute) else base.id for base in node.bases
+                     if isinstance(base, (ast.Name, ast.Attribute))]
+            classes[node.name] = (methods, bases)
+    return classes
+
+_class_tables = ast_cache.LRUCache()
+
+class MethodSummaries:
+    """
+    Dependency summaries of class methods, so tracing the generic classes a DAG
+    calls into is a union of precomputed results instead of a walk per DAG.
+    Each method body is visited once per (file, content hash, class, method),
+    recording the paths it references, the modules it imports and the methods it
+    calls (self.m(), obj.m() on instances it creates). summary() composes these
+    transitively across classes and modules; the walk keeps a visited set, so
+    recursive and mutually recursive methods terminate. Inherited methods are
+    found through base classes in the same or imported modules.
+    Summaries hold for one repo snapshot, like the ModuleScopes they use.
+    """
+
+    def __init__(self, file_lookup_map, module_index=None, scopes=None):
         self.file_lookup_map = file_lookup_map
+        self.module_index = module_index if module_index is not None else ModuleIndex(file_lookup_map)
+        self.scopes = scopes if scopes is not None else ModuleScopes(file_lookup_map, self.module_index)
+        self._hashes = {}  # path -> content hash
+        self._imports = {}  # path -> (repo paths it imports, from-import names)
+        self._local = {}  # (path, content hash, class, method) -> MethodSummary of the body alone
+        self._closures = {}  # same key -> MethodSummary including everything it calls
+
+    def _key(self, path, class_name, method):
+        digest = self._hashes.get(path)
+        if digest is None:
+            digest = self._hashes[path] = ast_cache.content_hash(self.file_lookup_map[path])
+        return (path, digest, class_name, method)
+
+    def _classes(self, path):
+        source = self.file_lookup_map.get(path)
+        return _class_tables.get_or_compute(source, _class_table) if source else {}
+
+    def _module_imports(self, path):
+        """(repo paths a module imports, {local name: imported name} of its from-imports)."""
+        imports = self._imports.get(path)
+        if imports is None:
+            imported, names = [], {}
+            try:
+                tree = ast_cache.parse(self.file_lookup_map[path])
+            except (KeyError, SyntaxError, ValueError):
+                tree = None
+            for node in ast.walk(tree) if tree is not None else ():
+                if isinstance(node, ast.Import):
+                    modules = [alias.name for alias in node.names]
+                elif isinstance(node, ast.ImportFrom):
+                    modules = [node.module]
+                    names.update((alias.asname or alias.name, alias.name) for alias in node.names)
+                else:
+                    continue
+                for module in modules:
+                    mod_path = self.module_index.lookup(module)
+                    if mod_path and mod_path != path and mod_path not in imported:
+                        imported.append(mod_path)
+            imports = self._imports[path] = (imported, names)
+        return imports
+
+    def _imported_paths(self, path):
+        return self._module_imports(path)[0]
+
+    def find_method(self, path, class_name, method, _seen=None):
+        """(path, class, method) of the def a call resolves to, following base classes, or None."""
+        classes = self._classes(path)
+        if class_name not in classes:
+            return None
+        methods, bases = classes[class_name]
+        if method in methods:
+            return (path, class_name, method)
+        seen = _seen if _seen is not None else set()
+        seen.add((path, class_name))
+        for base in bases:
+            for candidate in [path] + self._imported_paths(path):
+                if (candidate, base) in seen or base not in self._classes(candidate):
+                    continue
+                found = self.find_method(candidate, base, method, seen)
+                if found is not None:
+                    return found
+                break  # the base resolved to this class, which does not have the method
+        return None
+
+    def local_summary(self, path, class_name, method):
+        """What the method's own body references and calls, without following the calls."""
+        key = self._key(path, class_name, method)
+        summary = self._local.get(key)
+        if summary is not None:
+            return summary
+        node = self._classes(path)[class_name][0][method]
+        extractor = GeneralDependencyExtractor(self.file_lookup_map, self.module_index, self.scopes, self)
+        extractor.current_file = path
+        extractor.imported_names.update(self._module_imports(path)[1])
+        extractor.class_instances['self'] = class_name
+        try:
+            extractor.visit_function_body(node)
+        except Exception as e:
+            print(f"Failed to trace {class_name}.{method} in {path}: {e}")
+            summary = self._local[key] = EMPTY_SUMMARY
+            return summary
+
+        candidates = [path] + self._imported_paths(path)
+        calls = []
+        for callee_class, callee_methods in extractor.class_method_map.items():
+            for callee in sorted(callee_methods):
+                for candidate in candidates:
+                    found = self.find_method(candidate, callee_class, callee)
+                    if found is not None:
+                        calls.append(found)
+                        break
+        summary = MethodSummary(frozenset(extractor.dependencies),
+                                frozenset(extractor.generic_class_files | {path}), tuple(calls))
+        self._local[key] = summary
+        return summary
+
+    def summary(self, path, class_name, method):
+        """
+        Everything a call of class_name.method (defined in or inherited by the
+        class in path) references, through all the methods it reaches; None if
+        the class or method is not there.
+        """
+        start = self.find_method(path, class_name, method)
+        if start is None:
+            return None
+        key = self._key(*start)
+        summary = self._closures.get(key)
+        if summary is not None:
+            return summary
+
+        dependencies, source_files = set(), set()
+        reached = [start]
+        seen = {start}
+        pending = [start]
+        while pending:
+            local = self.local_summary(*pending.pop())
+            dependencies |= local.dependencies
+            source_files |= local.source_files
+            for callee in local.calls:
+                if callee not in seen:
+                    seen.add(callee)
+                    reached.append(callee)
+                    pending.append(callee)
+        summary = MethodSummary(frozenset(dependencies), frozenset(source_files), tuple(reached))
+        self._closures[key] = summary
+        return summary
+
+class GeneralDependencyExtractor(OrderedScopeVisitor):
+    def __init__(self, file_lookup_map, module_index=None, scopes=None, summaries=None):
+        self.file_lookup_map = file_lookup_map
+        self.module_index = module_index if module_index is not None else ModuleIndex(file_lookup_map)
+        self.scopes = scopes if scopes is not None else ModuleScopes(file_lookup_map, self.module_index)
+        self.summaries = summaries if summaries is not None else MethodSummaries(file_lookup_map, self.module_index,
+                                                                                 self.scopes)
         self.visited_files = set()
         self.dependencies = set()
-        self.variable_map = {}
+        self.variable_map = {}  # statically known names at the node being visited (see OrderedScopeVisitor)
         self.generic_class_files = set()  # files where class methods should be traced
         self.class_method_map = {}  # {class_name: set(methods_called)}
         self.class_instances = {}  # {variable_name: class_name}
+        self.imported_names = {}  # {local name: imported name}, for from lib import Helper as H
 
     def parse_and_visit(self, file_path):
         if file_path in self.visited_files or file_path not in self.file_lookup_map:
@@ -17,7 +193,7 @@ class GeneralDependencyExtractor(ast.NodeVisitor):
         self.visited_files.add(file_path)
         content = self.file_lookup_map[file_path]
         try:
-            tree = ast.parse(content)
+            tree = ast_cache.parse(content)
         except Exception as e:
             print(f"Skipping {file_path} due to parse error: {e}")
             return
@@ -26,6 +202,8 @@ class GeneralDependencyExtractor(ast.NodeVisitor):
 
     def visit_ImportFrom(self, node):
         self._maybe_mark_generic_module(node.module)
+        for alias in node.names:
+            self.imported_names[alias.asname or alias.name] = alias.name
         self.generic_visit(node)
 
     def visit_Import(self, node):
@@ -39,9 +217,10 @@ class GeneralDependencyExtractor(ast.NodeVisitor):
             self.generic_class_files.add(mod_path)
 
     def visit_Assign(self, node):
-        # Look for gm = generic_method.AirflowGen(...)
-        if isinstance(node.value, ast.Call) and isinstance(node.value.func, ast.Attribute):
-            class_name = node.value.func.attr
+        # Look for gm = generic_method.AirflowGen(...) or h = Helper(...) (from lib.other import Helper)
+        if isinstance(node.value, ast.Call) and isinstance(node.value.func, (ast.Attribute, ast.Name)):
+            func = node.value.func
+            class_name = func.attr if isinstance(func, ast.Attribute) else self.imported_names.get(func.id, func.id)
             if isinstance(node.targets[0], ast.Name):
                 instance_var = node.targets[0].id
                 self.class_instances[instance_var] = class_name
@@ -64,12 +243,14 @@ class GeneralDependencyExtractor(ast.NodeVisitor):
         self.generic_visit(node)
 
     def resolve_node_to_string(self, node):
-        if isinstance(node, ast.Str):
-            return node.s
-        elif isinstance(node, ast.JoinedStr):
+        try:
+            value = evaluate(node, self.variable_map)
+            if isinstance(value, str):
+                return value
+        except Unresolved:
+            pass
+        if isinstance(node, ast.JoinedStr):
             return self.resolve_f_string(node)
-        elif isinstance(node, ast.Name):
-            return self.variable_map.get(node.id)
         elif isinstance(node, ast.Call):
             if isinstance(node.func, ast.Attribute) and node.func.attr == 'join':
                 return self.resolve_os_path_join(node)
@@ -78,54 +259,117 @@ class GeneralDependencyExtractor(ast.NodeVisitor):
     def resolve_os_path_join(self, call_node):
         parts = []
         for arg in call_node.args:
-            if isinstance(arg, ast.Str):
-                parts.append(arg.s)
-            elif isinstance(arg, ast.Name) and arg.id in self.variable_map:
-                parts.append(self.variable_map[arg.id])
+            if isinstance(arg, ast.JoinedStr):
+                parts.append(self.resolve_f_string(arg))
+                continue
+            try:
+                value = evaluate(arg, self.variable_map)
+            except Unresolved:
+                continue  # unknown parts are left out, as before
+            if isinstance(value, str):
+                parts.append(value)
         return os.path.join(*parts) if parts else None
 
     def resolve_f_string(self, node):
-        return "".join([
-            val.s if isinstance(val, ast.Str) else "{var}"
-            for val in node.values
-        ])
+        return render_fstring(node, self.variable_map, lambda field: "{var}")
 
     def _is_valid_dependency(self, value):
         return any(value.endswith(ext) for ext in ['.sql', '.txt', '.py', '.json', '.yaml', '.yml'])
 
     def resolve_module_to_path(self, module_name):
-        module_parts = module_name.split('.')
-        for path in self.file_lookup_map:
-            if path.endswith('.py') and all(part in path for part in module_parts):
-                return path
-        return None
+        return self.module_index.lookup(module_name)
 
     def trace_class_methods(self):
-        for filepath in self.generic_class_files:
-            content = self.file_lookup_map.get(filepath)
-            if not content:
-                continue
-            try:
-                tree = ast.parse(content)
-                for node in ast.walk(tree):
-                    if isinstance(node, ast.ClassDef) and node.name in self.class_method_map:
-                        for item in node.body:
-                            if isinstance(item, ast.FunctionDef) and item.name in self.class_method_map[node.name]:
-                                for stmt in item.body:
-                                    self.visit(stmt)
-            except Exception as e:
-                print(f"Failed to parse {filepath} for class methods: {e}")
+        # union of the (cached, transitive) summaries of every method the DAG calls
+        traced_files = set()
+        for filepath in sorted(self.generic_class_files):
+            for class_name, methods in self.class_method_map.items():
+                for method in methods:
+                    summary = self.summaries.summary(filepath, class_name, method)
+                    if summary is not None:
+                        self.dependencies |= summary.dependencies
+                        traced_files |= summary.source_files
+        self.generic_class_files |= traced_files
 
     def get_all_dependencies(self):
         return sorted(list(self.dependencies | self.visited_files))
 
-def extract_dependencies_recursive(dag_file_path, all_files_objects):
-    file_lookup_map = {
+    def get_source_files(self):
+        """Repo files whose content was read to produce the dependencies."""
+        return sorted(list(self.visited_files | self.generic_class_files))
+
+def build_file_lookup_map(all_files_objects):
+    return {
         fobj['full_path']: fobj['content']
         for fobj in all_files_objects
     }
 
-    extractor = GeneralDependencyExtractor(file_lookup_map)
+def run_extractor(dag_file_path, file_lookup_map, module_index=None, with_sources=False, scopes=None,
+                  summaries=None):
+    extractor = GeneralDependencyExtractor(file_lookup_map, module_index, scopes, summaries)
     extractor.parse_and_visit(dag_file_path)
     extractor.trace_class_methods()
+    if with_sources:
+        return extractor.get_all_dependencies(), extractor.get_source_files()
     return extractor.get_all_dependencies()
+
+def extract_dependencies_recursive(dag_file_path, all_files_objects):
+    file_lookup_map = build_file_lookup_map(all_files_objects)
+    return run_extractor(dag_file_path, file_lookup_map)
+
+# Set in the parent before forking (inherited copy-on-write) or by
+# _init_batch_worker when processes are spawned.
+_batch_lookup_map = None
+_batch_module_index = None
+_batch_with_sources = False
+_batch_scopes = None  # per process, so config modules are evaluated once per worker
+_batch_summaries = None  # per process, so each generic class method is traced once per worker
+
+def _init_batch_worker(file_lookup_map, module_index, with_sources):
+    global _batch_lookup_map, _batch_module_index, _batch_with_sources, _batch_scopes, _batch_summaries
+    _batch_lookup_map = file_lookup_map
+    _batch_module_index = module_index
+    _batch_with_sources = with_sources
+    _batch_scopes = ModuleScopes(file_lookup_map, module_index) if file_lookup_map is not None else None
+    _batch_summaries = MethodSummaries(file_lookup_map, module_index, _batch_scopes) \
+        if file_lookup_map is not None else None
+
+def _extract_one(dag_file_path):
+    try:
+        result = run_extractor(dag_file_path, _batch_lookup_map, _batch_module_index, _batch_with_sources,
+                               _batch_scopes, _batch_summaries)
+        return dag_file_path, result, None
+    except Exception as e:
+        return dag_file_path, None, f"{type(e).__name__}: {e}"
+
+def extract_dependencies_batch(dag_file_paths, all_files_objects, max_workers=None, with_sources=False):
+    """
+    Runs the extractor for every DAG of a repo on all cores.
+    The lookup map and module index are built once and shared with the workers
+    (copy-on-write through fork where available).
+    Returns {dag_path: dependencies}, or {dag_path: (dependencies, source_files)}
+    with with_sources=True; a DAG that fails maps to None and is reported
+    without affecting the others.
+    """
+    file_lookup_map = build_file_lookup_map(all_files_objects)
+    module_index = ModuleIndex(file_lookup_map)
+    dag_file_paths = list(dag_file_paths)
+    max_workers = max_workers or os.cpu_count() or 1
+    chunksize = max(1, len(dag_file_paths) // (max_workers * 4))
+
+    if 'fork' in multiprocessing.get_all_start_methods():
+        _init_batch_worker(file_lookup_map, module_index, with_sources)
+        pool_args = {"mp_context": multiprocessing.get_context('fork')}
+    else:
+        pool_args = {"initializer": _init_batch_worker, "initargs": (file_lookup_map, module_index, with_sources)}
+
+    results = {}
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers, **pool_args) as pool:
+            for dag_file_path, dependencies, error in pool.map(_extract_one, dag_file_paths, chunksize=chunksize):
+                if error:
+                    print(f"Failed to extract dependencies for {dag_file_path}: {error}")
+                results[dag_file_path] = dependencies
+    finally:
+        _init_batch_worker(None, None, False)
+    return results
@@ -1,46 +1,32 @@
-#!/bin/bash
+import os
+import sys
+from generic_wrapper import GENERIC_FILE_NAME, GenericMethodIndex, find_wrapper_calls
+from is_dag_file import classify_dag_source
 
-GENERIC_FILE="generic_method.py"
+def used_method_paths(root=".", generic_file=GENERIC_FILE_NAME):
+    """
+    {method: path} for every wrapper method a DAG under root calls: the first
+    self.<attr> of the method's cmds list, resolved through __init__.
+    Same output as the old grep/awk pipeline, from one AST index of generic_file.
+    """
+    with open(generic_file, 'r', encoding='utf-8') as f:
+        index = GenericMethodIndex({generic_file: f.read()})
 
-# 1. Get all method names used as gm.method_name()
-METHODS=$(grep -rl "from airflow import DAG" . --include="*.py" \
-  | xargs grep -h "gm\." \
-  | sed -nE 's/.*gm\.([a-zA-Z0-9_]+)\(.*/\1/p' \
-  | sort -u)
+    used = set()
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            if not filename.endswith('.py'):
+                continue
+            path = os.path.join(dirpath, filename)
+            with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+                source = f.read()
+            if classify_dag_source(source).startswith("DAG detected"):
+                used.update(call.method for call in find_wrapper_calls(path, source, index))
 
-# 2. For each method, extract self.var from cmds and map to path from __init__
-for method in $METHODS; do
-  # get variable name like self.xyz from cmds list in that method
-  var=$(awk -v method="$method" '
-    $0 ~ "def "method"\\(" {in_func=1}
-    in_func && $0 ~ /cmds *= *\[/ {
-      for (i=1; i<=NF; i++) {
-        if ($i ~ /self\./) {
-          match($i, /self\.([a-zA-Z0-9_]+)/, arr)
-          if (arr[1] != "") {
-            print arr[1]
-            exit
-          }
-        }
-      }
-    }
-    in_func && /def / && $0 !~ "def "method"\\(" {in_func=0}
-  ' "$GENERIC_FILE")
+    method_paths = index.method_paths()
+    return {method: method_paths[method][0] for method in sorted(used) if method_paths.get(method)}
 
-  # get path of that self.var from __init__
-  if [[ -n "$var" ]]; then
-    path=$(awk -v var="$var" '
-      $0 ~ "def __init__" {in_init=1}
-      in_init && $0 ~ "self\\."var" *= *" {
-        match($0, /"var"[ \t]*=[ \t]*"([^"]+)"/, m)
-        if (m[1] != "") {
-          print m[1]
-          exit
-        }
-      }
-    ' "$GENERIC_FILE")
-    if [[ -n "$path" ]]; then
-      echo "$method:$path"
-    fi
-  fi
-done
+if __name__ == "__main__":
+    generic_file = sys.argv[1] if len(sys.argv) > 1 else GENERIC_FILE_NAME
+    for method, path in used_method_paths(".", generic_file).items():
+        print(f"{method}:{path}")
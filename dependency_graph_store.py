@@ -0,0 +1,249 @@
+import ast
+import json
+import posixpath
+import sqlite3
+import ast_cache
+from dagdependencies_gitlab import extract_dependencies_batch
+from module_index import ModuleIndex
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    repo TEXT NOT NULL,
+    path TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    PRIMARY KEY (repo, path)
+);
+CREATE TABLE IF NOT EXISTS dags (
+    repo TEXT NOT NULL,
+    dag_path TEXT NOT NULL,
+    dependencies TEXT NOT NULL,
+    imports_recorded INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (repo, dag_path)
+);
+CREATE TABLE IF NOT EXISTS dag_inputs (
+    repo TEXT NOT NULL,
+    dag_path TEXT NOT NULL,
+    input_name TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_dag_inputs_name ON dag_inputs (repo, input_name);
+CREATE INDEX IF NOT EXISTS idx_dag_inputs_dag ON dag_inputs (repo, dag_path);
+CREATE TABLE IF NOT EXISTS dag_imports (
+    repo TEXT NOT NULL,
+    dag_path TEXT NOT NULL,
+    module_name TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_dag_imports_name ON dag_imports (repo, module_name);
+CREATE INDEX IF NOT EXISTS idx_dag_imports_dag ON dag_imports (repo, dag_path);
+CREATE TABLE IF NOT EXISTS file_results (
+    analyzer TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    result TEXT NOT NULL,
+    PRIMARY KEY (analyzer, content_hash)
+);
+CREATE TABLE IF NOT EXISTS scans (
+    repo TEXT PRIMARY KEY,
+    commit_sha TEXT
+);
+"""
+
+SQLITE_MAX_VARS = 900
+
+def _batched(items, size=SQLITE_MAX_VARS):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+def import_names(source):
+    """Module names a file imports, as the extractor looks them up in ModuleIndex."""
+    try:
+        tree = ast_cache.parse(source)
+    except (SyntaxError, ValueError):
+        return set()
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            names.add(node.module)
+    return names
+
+class DependencyGraphStore:
+    """
+    Persistent DAG dependency graph in SQLite, keyed by file content hash.
+
+    Each DAG's dependencies are stored together with the files that were read to
+    compute them. On the next scan only DAGs that touch a changed file are
+    re-extracted; everything else is served from the store.
+    Dependencies found as string literals (e.g. 'sql/load.sql') are matched
+    against changed files by base name, which over-approximates.
+    Imports are matched by module name: when .py files are added or removed, a
+    DAG is re-extracted if one of the names its files import now resolves to a
+    different file (or resolves where it did not, or no longer does).
+    """
+
+    def __init__(self, db_path="dependency_graph.db"):
+        self.conn = sqlite3.connect(db_path)
+        self._add_imports_recorded()
+        self.conn.executescript(SCHEMA)
+
+    def _add_imports_recorded(self):
+        """Adds dags.imports_recorded in stores created before the column existed."""
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(dags)")]
+        if not columns or "imports_recorded" in columns:
+            return
+        with self.conn:
+            self.conn.execute("ALTER TABLE dags ADD COLUMN imports_recorded INTEGER NOT NULL DEFAULT 0")
+            self.conn.execute("UPDATE dags SET imports_recorded = 1 WHERE EXISTS "
+                              "(SELECT 1 FROM dag_imports WHERE dag_imports.repo = dags.repo "
+                              "AND dag_imports.dag_path = dags.dag_path)")
+
+    def close(self):
+        self.conn.close()
+
+    def last_commit(self, repo):
+        row = self.conn.execute("SELECT commit_sha FROM scans WHERE repo = ?", (repo,)).fetchone()
+        return row[0] if row else None
+
+    def changed_files(self, repo, file_hashes):
+        """Paths added, modified or removed compared to the stored scan of this repo."""
+        stored = dict(self.conn.execute("SELECT path, content_hash FROM files WHERE repo = ?", (repo,)))
+        changed = {path for path, content_hash in file_hashes.items() if stored.get(path) != content_hash}
+        changed.update(path for path in stored if path not in file_hashes)
+        return changed
+
+    def affected_dags(self, repo, dag_paths, changed_paths, file_paths=None):
+        """
+        DAGs that are new, changed themselves, (transitively) read a changed file,
+        or import a module name whose resolution changes with file_paths (the
+        snapshot's paths, compared with the stored scan).
+        """
+        stored_dags = {row[0] for row in self.conn.execute("SELECT dag_path FROM dags WHERE repo = ?", (repo,))}
+        affected = {dag for dag in dag_paths if dag not in stored_dags or dag in changed_paths}
+        if file_paths is not None:
+            affected |= self._dags_with_moved_imports(repo, file_paths)
+
+        names = set(changed_paths) | {posixpath.basename(path) for path in changed_paths}
+        for batch in _batched(names):
+            placeholders = ",".join("?" * len(batch))
+            rows = self.conn.execute(
+                f"SELECT DISTINCT dag_path FROM dag_inputs WHERE repo = ? AND input_name IN ({placeholders})",
+                [repo] + batch
+            )
+            affected.update(row[0] for row in rows)
+        return affected & set(dag_paths)
+
+    def _dags_with_moved_imports(self, repo, file_paths):
+        # ModuleIndex keeps the first path registered for a suffix, so both are built
+        # in snapshot order, the order the extractor registers them in
+        stored_py = [row[0] for row in self.conn.execute("SELECT path FROM files WHERE repo = ? ORDER BY rowid", (repo,))
+                     if row[0].endswith('.py')]
+        current_py = [path for path in file_paths if path.endswith('.py')]
+        if set(stored_py) == set(current_py):
+            return set()
+        old_index, new_index = ModuleIndex(stored_py), ModuleIndex(current_py)
+        names = {row[0] for row in self.conn.execute("SELECT DISTINCT module_name FROM dag_imports WHERE repo = ?",
+                                                     (repo,))}
+        moved = [name for name in names if old_index.lookup(name) != new_index.lookup(name)]
+        affected = set()
+        for batch in _batched(moved):
+            placeholders = ",".join("?" * len(batch))
+            rows = self.conn.execute(
+                f"SELECT DISTINCT dag_path FROM dag_imports WHERE repo = ? AND module_name IN ({placeholders})",
+                [repo] + batch
+            )
+            affected.update(row[0] for row in rows)
+        # DAGs stored before imports were recorded have no rows; their imports are unknown
+        affected.update(row[0] for row in self.conn.execute(
+            "SELECT dag_path FROM dags WHERE repo = ? AND imports_recorded = 0", (repo,)))
+        return affected
+
+    def update(self, repo, all_files_objects, dag_paths, changed_paths=None, commit_sha=None, max_workers=None):
+        """
+        Brings the stored graph up to date with the given repo snapshot and returns
+        {dag_path: dependencies} for every DAG in dag_paths.
+        changed_paths (e.g. from repo_cache.fetch_changed_paths) is optional; when
+        omitted, changes are found by comparing content hashes.
+        """
+        dag_paths = list(dag_paths)
+        contents = {fobj['full_path']: fobj['content'] for fobj in all_files_objects}
+        file_hashes = {path: ast_cache.content_hash(content) for path, content in contents.items()}
+        if changed_paths is None:
+            changed_paths = self.changed_files(repo, file_hashes)
+
+        affected = self.affected_dags(repo, dag_paths, changed_paths, file_hashes.keys())
+        print(f"{repo}: {len(changed_paths)} changed files, re-extracting {len(affected)} of {len(dag_paths)} DAGs")
+        results = extract_dependencies_batch(affected, all_files_objects, max_workers, with_sources=True) if affected else {}
+
+        with self.conn:
+            for dag_path, result in results.items():
+                self.conn.execute("DELETE FROM dag_inputs WHERE repo = ? AND dag_path = ?", (repo, dag_path))
+                self.conn.execute("DELETE FROM dag_imports WHERE repo = ? AND dag_path = ?", (repo, dag_path))
+                if result is None:
+                    # keep failures out of the store so they are retried next run
+                    self.conn.execute("DELETE FROM dags WHERE repo = ? AND dag_path = ?", (repo, dag_path))
+                    continue
+                dependencies, source_files = result
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO dags (repo, dag_path, dependencies, imports_recorded) VALUES (?, ?, ?, 1)",
+                    (repo, dag_path, json.dumps(dependencies))
+                )
+                input_names = set(source_files)
+                for dependency in dependencies:
+                    input_names.add(dependency)
+                    input_names.add(posixpath.basename(dependency))
+                self.conn.executemany(
+                    "INSERT INTO dag_inputs (repo, dag_path, input_name) VALUES (?, ?, ?)",
+                    [(repo, dag_path, name) for name in input_names]
+                )
+                imported = set()
+                for path in source_files:
+                    if path in contents:
+                        imported |= import_names(contents[path])
+                self.conn.executemany(
+                    "INSERT INTO dag_imports (repo, dag_path, module_name) VALUES (?, ?, ?)",
+                    [(repo, dag_path, name) for name in imported]
+                )
+
+            current = set(dag_paths)
+            removed = [row[0] for row in self.conn.execute("SELECT dag_path FROM dags WHERE repo = ?", (repo,))
+                       if row[0] not in current]
+            for dag_path in removed:
+                self.conn.execute("DELETE FROM dags WHERE repo = ? AND dag_path = ?", (repo, dag_path))
+                self.conn.execute("DELETE FROM dag_inputs WHERE repo = ? AND dag_path = ?", (repo, dag_path))
+                self.conn.execute("DELETE FROM dag_imports WHERE repo = ? AND dag_path = ?", (repo, dag_path))
+
+            self.conn.execute("DELETE FROM files WHERE repo = ?", (repo,))
+            self.conn.executemany(
+                "INSERT INTO files (repo, path, content_hash) VALUES (?, ?, ?)",
+                [(repo, path, content_hash) for path, content_hash in file_hashes.items()]
+            )
+            if commit_sha:
+                self.conn.execute("INSERT OR REPLACE INTO scans (repo, commit_sha) VALUES (?, ?)", (repo, commit_sha))
+
+        return self.get_dependencies(repo, dag_paths)
+
+    def get_dependencies(self, repo, dag_paths=None):
+        rows = self.conn.execute("SELECT dag_path, dependencies FROM dags WHERE repo = ?", (repo,))
+        stored = {dag_path: json.loads(dependencies) for dag_path, dependencies in rows}
+        if dag_paths is None:
+            return stored
+        return {dag_path: stored.get(dag_path) for dag_path in dag_paths}
+
+    def cached_result(self, analyzer, content, compute):
+        """
+        Memoizes any per-file analysis (DAG detection, table extraction, ...) by
+        content hash. compute(content) must return a JSON-serializable value.
+        """
+        content_hash = ast_cache.content_hash(content)
+        row = self.conn.execute(
+            "SELECT result FROM file_results WHERE analyzer = ? AND content_hash = ?", (analyzer, content_hash)
+        ).fetchone()
+        if row:
+            return json.loads(row[0])
+        result = compute(content)
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO file_results (analyzer, content_hash, result) VALUES (?, ?, ?)",
+                (analyzer, content_hash, json.dumps(result))
+            )
+        return result
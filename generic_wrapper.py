@@ -0,0 +1,305 @@
+import ast
+import csv
+import posixpath
+import sqlite3
+from collections import namedtuple
+import ast_cache
+from constant_eval import Namespace, Unresolved, evaluate, module_constants
+from constant_propagation import ModuleScopes
+from is_dag_file import classify_dag_source
+
+GENERIC_FILE_NAME = "generic_method.py"
+CMDS_NAME = "cmds"
+
+WrapperMethod = namedtuple("WrapperMethod", ["path", "class_name", "name", "params", "cmd_attrs", "paths"])
+WrapperCall = namedtuple("WrapperCall", ["dag_path", "lineno", "class_name", "method", "args"])
+
+_UNKNOWN = object()
+
+def _positional_defaults(args):
+    positional = args.posonlyargs + args.args
+    defaults = [None] * (len(positional) - len(args.defaults)) + list(args.defaults)
+    return list(zip(positional + args.kwonlyargs, defaults + list(args.kw_defaults)))
+
+def init_attributes(class_node, constants):
+    """
+    Values of the self.<attr> assignments in a class's __init__, evaluated
+    statically over the module constants; parameters take their default value.
+    """
+    attributes = Namespace()
+    init = next((item for item in class_node.body
+                 if isinstance(item, ast.FunctionDef) and item.name == '__init__'), None)
+    if init is None:
+        return attributes
+
+    scope = dict(constants)
+    for arg, default in _positional_defaults(init.args):
+        scope.pop(arg.arg, None)
+        if default is not None:
+            try:
+                scope[arg.arg] = evaluate(default, constants)
+            except Unresolved:
+                pass
+    scope['self'] = attributes
+
+    assignments = sorted((node for node in ast.walk(init)
+                          if isinstance(node, (ast.Assign, ast.AnnAssign)) and node.value is not None),
+                         key=lambda node: (node.lineno, node.col_offset))
+    for node in assignments:
+        try:
+            value = evaluate(node.value, scope)
+        except Unresolved:
+            value = _UNKNOWN
+        for target in node.targets if isinstance(node, ast.Assign) else [node.target]:
+            if isinstance(target, ast.Attribute) and isinstance(target.value, ast.Name) and target.value.id == 'self':
+                store, key = attributes, target.attr
+            elif isinstance(target, ast.Name) and target.id != 'self':
+                store, key = scope, target.id
+            else:
+                continue
+            if value is _UNKNOWN:
+                store.pop(key, None)
+            else:
+                store[key] = value
+    return attributes
+
+def cmd_attributes(method_node, cmds_name=CMDS_NAME):
+    """self.<attr> names a method puts in its cmds list (cmds = [...], cmds += / append / extend), in source order."""
+    values = []
+    for node in ast.walk(method_node):
+        if isinstance(node, ast.Assign) and any(isinstance(t, ast.Name) and t.id == cmds_name for t in node.targets):
+            values.append(node.value)
+        elif isinstance(node, ast.AugAssign) and isinstance(node.target, ast.Name) and node.target.id == cmds_name:
+            values.append(node.value)
+        elif isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) \
+                and node.func.attr in ('append', 'extend', 'insert') \
+                and isinstance(node.func.value, ast.Name) and node.func.value.id == cmds_name:
+            values.extend(node.args)
+
+    references = [node for value in values for node in ast.walk(value)
+                  if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name) and node.value.id == 'self']
+    names = []
+    for node in sorted(references, key=lambda node: (node.lineno, node.col_offset)):
+        if node.attr not in names:
+            names.append(node.attr)
+    return names
+
+class GenericMethodIndex:
+    """
+    Index of the generic wrapper classes (generic_method.py): for every method,
+    the self.<attr> entries of its cmds list and the paths __init__ assigns to
+    them. Built once from the AST; replaces the grep/awk pass per method.
+    sources is {path: content} of one or more generic method files.
+    """
+
+    def __init__(self, sources, cmds_name=CMDS_NAME):
+        self.methods = {}  # (class_name, method) -> WrapperMethod
+        self.by_method = {}  # method -> [WrapperMethod]
+        for path, source in sources.items():
+            try:
+                tree = ast_cache.parse(source)
+            except (SyntaxError, ValueError) as e:
+                print(f"Skipping {path} due to parse error: {e}")
+                continue
+            constants = module_constants(source)
+            for node in tree.body:
+                if isinstance(node, ast.ClassDef):
+                    self._add_class(path, node, constants, cmds_name)
+
+    def _add_class(self, path, class_node, constants, cmds_name):
+        attributes = init_attributes(class_node, constants)
+        for item in class_node.body:
+            if not isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)) or item.name == '__init__':
+                continue
+            attrs = cmd_attributes(item, cmds_name)
+            paths = [attributes[attr] for attr in attrs if isinstance(attributes.get(attr), str)]
+            params = [arg.arg for arg, _ in _positional_defaults(item.args)][1:]  # without self
+            method = WrapperMethod(path, class_node.name, item.name, params, attrs, paths)
+            self.methods.setdefault((class_node.name, item.name), method)
+            self.by_method.setdefault(item.name, []).append(method)
+
+    @property
+    def class_names(self):
+        return {class_name for class_name, _ in self.methods}
+
+    def lookup(self, method, class_name=None):
+        """The WrapperMethod for a call; without a class, the first class defining the method."""
+        if class_name is not None:
+            return self.methods.get((class_name, method))
+        candidates = self.by_method.get(method)
+        return candidates[0] if candidates else None
+
+    def method_paths(self):
+        """{method: paths} over all classes, the mapping depend_gitlab.py prints."""
+        return {name: methods[0].paths for name, methods in self.by_method.items()}
+
+def _bind_arguments(method, call, scope):
+    """{param: value} of the statically known arguments of a wrapper call."""
+    args = {}
+    for param, node in zip(method.params, call.args):
+        if isinstance(node, ast.Starred):
+            break
+        try:
+            args[param] = evaluate(node, scope)
+        except Unresolved:
+            pass
+    for keyword in call.keywords:
+        if keyword.arg is None:
+            continue
+        try:
+            args[keyword.arg] = evaluate(keyword.value, scope)
+        except Unresolved:
+            pass
+    return args
+
+def find_wrapper_calls(dag_path, source, index, scope=None, instance_names=("gm",)):
+    """
+    Calls of wrapper methods in a DAG, as WrapperCall(dag_path, lineno,
+    class_name, method, args). Instances are variables assigned from one of the
+    indexed classes (gm = generic_method.AirflowGen(...)); names in
+    instance_names count as instances of any indexed class, like the gm.
+    convention the shell script relied on. Arguments are evaluated in scope
+    (the DAG's known constants) and bound to the method's parameter names.
+    """
+    try:
+        tree = ast_cache.parse(source)
+    except (SyntaxError, ValueError):
+        return []
+    scope = scope or {}
+    class_names = index.class_names
+
+    aliases = {}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ImportFrom):
+            for alias in node.names:
+                if alias.name in class_names:
+                    aliases[alias.asname or alias.name] = alias.name
+
+    instances = {}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Assign) and isinstance(node.value, ast.Call):
+            func = node.value.func
+            class_name = func.attr if isinstance(func, ast.Attribute) else aliases.get(getattr(func, 'id', None))
+            if class_name in class_names:
+                for target in node.targets:
+                    if isinstance(target, ast.Name):
+                        instances[target.id] = class_name
+
+    calls = []
+    for node in ast.walk(tree):
+        if not (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+                and isinstance(node.func.value, ast.Name)):
+            continue
+        instance = node.func.value.id
+        if instance in instances:
+            method = index.lookup(node.func.attr, instances[instance])
+        elif instance in instance_names:
+            method = index.lookup(node.func.attr)
+        else:
+            continue
+        if method is not None:
+            calls.append(WrapperCall(dag_path, node.lineno, method.class_name, method.name,
+                                     _bind_arguments(method, node, scope)))
+    calls.sort(key=lambda call: call.lineno)
+    return calls
+
+class JobConfigTable:
+    """
+    Local snapshot of the job-config table the wrapper reads at runtime
+    (a CSV export or a table in a SQLite file). Rows are plain dicts; each
+    column used for matching is indexed once, on first use.
+    """
+
+    def __init__(self, rows):
+        self.rows = [dict(row) for row in rows]
+        self.columns = {}
+        for row in self.rows:
+            for column in row:
+                if isinstance(column, str):  # DictReader files a ragged row's extra fields under None
+                    self.columns.setdefault(column.lower(), column)
+        self._indexes = {}
+
+    @classmethod
+    def from_csv(cls, path, **reader_args):
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            return cls(csv.DictReader(f, **reader_args))
+
+    @classmethod
+    def from_sqlite(cls, db_path, table):
+        conn = sqlite3.connect(db_path)
+        try:
+            conn.row_factory = sqlite3.Row
+            quoted = '"' + table.replace('"', '""') + '"'
+            return cls(dict(row) for row in conn.execute(f"SELECT * FROM {quoted}"))
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _key(value):
+        return str(value).strip()
+
+    def _index(self, column):
+        index = self._indexes.get(column)
+        if index is None:
+            index = {}
+            for position, row in enumerate(self.rows):
+                value = row.get(column)
+                if value is not None:
+                    index.setdefault(self._key(value), []).append(position)
+            self._indexes[column] = index
+        return index
+
+    def match(self, args, key_columns=None):
+        """
+        Rows matching a call's arguments. key_columns maps argument names to
+        columns ({'job_name': 'JOB_NM'}); by default an argument matches the
+        column of the same name, case-insensitively. Arguments without a
+        column are ignored; no usable argument means no match.
+        """
+        positions = None
+        for name, value in args.items():
+            column = (key_columns or {}).get(name) or self.columns.get(name.lower())
+            if column is None or not isinstance(value, (str, int, float)) or isinstance(value, bool):
+                continue
+            found = set(self._index(column).get(self._key(value), ()))
+            positions = found if positions is None else positions & found
+            if not positions:
+                return []
+        return [self.rows[position] for position in sorted(positions)] if positions else []
+
+def resolve_wrapper_dags(all_files_objects, config_table=None, key_columns=None,
+                         generic_file_name=GENERIC_FILE_NAME, cmds_name=CMDS_NAME):
+    """
+    Task-level details of every wrapper-based DAG in a repo snapshot, in bulk.
+    The generic method file(s) are indexed once, each DAG is scanned for wrapper
+    calls (arguments resolved with the DAG's constants, configs included), and
+    each call is joined with the job-config snapshot (a JobConfigTable).
+    Returns one dict per call:
+    {"dag_path", "lineno", "class_name", "method", "args", "paths", "config"}
+    where paths are the cmds paths of the method and config the matching rows.
+    """
+    sources = {fobj['full_path']: fobj['content'] for fobj in all_files_objects
+               if fobj['full_path'].endswith('.py')}
+    generic_sources = {path: source for path, source in sources.items()
+                       if posixpath.basename(path.replace('\\', '/')) == generic_file_name}
+    index = GenericMethodIndex(generic_sources, cmds_name)
+    if not index.methods:
+        return []
+    scopes = ModuleScopes(sources)
+
+    results = []
+    for path, source in sources.items():
+        if path in generic_sources or not classify_dag_source(source).startswith("DAG detected"):
+            continue
+        for call in find_wrapper_calls(path, source, index, scopes.module_scope(path)):
+            method = index.lookup(call.method, call.class_name)
+            results.append({
+                "dag_path": call.dag_path,
+                "lineno": call.lineno,
+                "class_name": call.class_name,
+                "method": call.method,
+                "args": call.args,
+                "paths": list(method.paths),
+                "config": config_table.match(call.args, key_columns) if config_table is not None else [],
+            })
+    return results
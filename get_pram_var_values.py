@@ -1,38 +1,118 @@
 import os
 import re
+import functools
 import importlib.util
 from pathlib import Path
+from constant_eval import module_constants
+
+SYS_PATH_APPEND_PATTERN = re.compile(r'sys\.path\.append\((["\'])(.*?)\1\)')
 
 def resolve_module_by_folder_name(content, module_name, base_file_path):
     """
     - Extracts last folder from sys.path.append(...) (e.g., 'configs')
     - Finds matching folder in repo
     - Loads module (e.g., config_file.py) from that folder
+    Executes the module; resolve_config_values gets its constants without doing so.
     """
-    repo_root = find_repo_root(Path(base_file_path))
-    path_append_matches = re.findall(r'sys\.path\.append\((["\'])(.*?)\1\)', content)
+    candidate_path = find_config_module(content, module_name, base_file_path)
+    if candidate_path is None:
+        raise ImportError(f"Could not resolve module '{module_name}' from sys.path.append() folders")
+    spec = importlib.util.spec_from_file_location(module_name, str(candidate_path))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
 
-    for _, raw_path in path_append_matches:
-        last_folder = Path(raw_path).parts[-1]  # e.g., 'configs'
-        matching_dirs = list(repo_root.rglob(last_folder))
 
-        for config_dir in matching_dirs:
-            if config_dir.is_dir():
-                candidate_path = config_dir / f"{module_name}.py"
-                if candidate_path.exists():
-                    spec = importlib.util.spec_from_file_location(module_name, str(candidate_path))
-                    module = importlib.util.module_from_spec(spec)
-                    spec.loader.exec_module(module)
-                    return module
+def find_repo_root(start_path: Path) -> Path:
+    """Walks upward to find the repo root (where .git or known files exist)."""
+    return _repo_root_of(str(Path(start_path).resolve()))
 
-    raise ImportError(f"Could not resolve module '{module_name}' from sys.path.append() folders")
+@functools.lru_cache(maxsize=None)
+def _repo_root_of(path_str):
+    # every directory on the way up is memoized, so sibling DAGs share the walk
+    path = Path(path_str)
+    if (path / ".git").exists() or (path / "README.md").exists():
+        return path
+    if path == path.parent:
+        raise FileNotFoundError("Could not locate repo root from base path")
+    return _repo_root_of(str(path.parent))
 
+class FolderIndex:
+    """
+    Every directory of a repo by folder name, with the .py modules it holds,
+    built from one walk. Replaces a repo_root.rglob(folder) per lookup.
+    """
 
-def find_repo_root(start_path: Path) -> Path:
-    """Walks upward to find the repo root (where .git or known files exist)."""
-    path = start_path.resolve()
-    while path != path.parent:
-        if (path / ".git").exists() or (path / "README.md").exists():
-            return path
-        path = path.parent
-    raise FileNotFoundError("Could not locate repo root from base path")
+    def __init__(self, repo_root):
+        self.repo_root = Path(repo_root)
+        self.dirs_by_name = {}
+        self.modules_by_dir = {}
+        for dirpath, dirnames, filenames in os.walk(self.repo_root):
+            dirnames[:] = sorted(d for d in dirnames if d != '.git')
+            for dirname in dirnames:
+                self.dirs_by_name.setdefault(dirname, []).append(os.path.join(dirpath, dirname))
+            self.modules_by_dir[dirpath] = {f[:-3] for f in filenames if f.endswith('.py')}
+
+    def find_module(self, folder_name, module_name):
+        """Path of <folder_name>/<module_name>.py, first in walk order, or None."""
+        for config_dir in self.dirs_by_name.get(folder_name, ()):
+            if module_name in self.modules_by_dir.get(config_dir, ()):
+                return Path(config_dir) / f"{module_name}.py"
+        return None
+
+@functools.lru_cache(maxsize=None)
+def folder_index(repo_root: Path) -> FolderIndex:
+    """FolderIndex of a repo, built on first use."""
+    return FolderIndex(repo_root)
+
+@functools.lru_cache(maxsize=None)
+def _config_module_path(repo_root, folders, module_name):
+    index = folder_index(repo_root)
+    for folder in folders:
+        candidate_path = index.find_module(folder, module_name)
+        if candidate_path is not None:
+            return candidate_path
+    return None
+
+def find_config_module(content, module_name, base_file_path):
+    """
+    Path of the module a DAG imports from one of its sys.path.append(...)
+    folders (matched by last folder name anywhere in the repo), or None.
+    """
+    repo_root = find_repo_root(Path(base_file_path))
+    folders = tuple(Path(raw_path).parts[-1] for _, raw_path in SYS_PATH_APPEND_PATTERN.findall(content)
+                    if Path(raw_path).parts)
+    return _config_module_path(repo_root, folders, module_name)
+
+_values_by_path = {}  # path -> (mtime_ns, size, constants)
+
+def _module_values(path):
+    stat = path.stat()
+    cached = _values_by_path.get(path)
+    if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+        return cached[2]
+    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+        constants = module_constants(f.read())  # shared per content hash across repos
+    _values_by_path[path] = (stat.st_mtime_ns, stat.st_size, constants)
+    return constants
+
+def resolve_config_values(content, module_name, base_file_path):
+    """
+    {name: value} of the constants a DAG imports from a config module found
+    through its sys.path.append(...) folders. Values are evaluated statically
+    from the module's AST (see constant_eval), so nothing is imported or run;
+    names that depend on runtime state are left out. After the first DAG of a
+    repo, lookups hit the folder index and the per-module cache.
+    The returned dict is shared and must not be modified.
+    """
+    candidate_path = find_config_module(content, module_name, base_file_path)
+    if candidate_path is None:
+        raise ImportError(f"Could not resolve module '{module_name}' from sys.path.append() folders")
+    return _module_values(candidate_path)
+
+def clear_caches():
+    """Forgets repo roots, folder indexes and module values, e.g. after a checkout."""
+    _repo_root_of.cache_clear()
+    folder_index.cache_clear()
+    _config_module_path.cache_clear()
+    _values_by_path.clear()
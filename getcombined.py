@@ -1,15 +1,17 @@
-import os
 import io
 import zipfile
-import shutil
 import re
+import tempfile
 import requests
 from base64 import b64decode
+from repo_cache import resolve_commit_sha
 
-def process_git_repo(provider, base_url, org_name, repo_name, token, search_file, mode='filename', branch='main'):
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+SPOOL_MAX_BYTES = 32 * 1024 * 1024
+
+def build_archive_request(provider, base_url, org_name, repo_name, token, branch='main'):
     """
-    Downloads and processes a GitHub/GitLab repo. 
-    Returns a list of matching files with content.
+    Returns the (api_url, headers) pair used to download a repo archive.
     """
     if provider.lower() == 'github':
         api_url = f"{base_url}/repos/{org_name}/{repo_name}/zipball/{branch}"
@@ -25,39 +27,79 @@ def process_git_repo(provider, base_url, org_name, repo_name, token, search_file
         }
     else:
         raise ValueError("Unsupported provider. Use 'github' or 'gitlab'.")
+    return api_url, headers
 
-    # Step 1: Download ZIP
-    print(f"Downloading {provider} repo '{repo_name}' from {api_url}")
-    response = requests.get(api_url, headers=headers, stream=True)
-    if response.status_code != 200:
-        raise Exception(f"Failed to fetch zip: {response.status_code} {response.text}")
+def iter_git_repo_files(provider, base_url, org_name, repo_name, token, search_file, mode='filename', branch='main', cache=None):
+    """
+    Streaming variant of process_git_repo.
+    The archive is spooled to a bounded temp file (in memory up to SPOOL_MAX_BYTES,
+    then on disk) and only the zip members whose name matches search_file are
+    decompressed. Yields one dict per matching file, nothing is extracted to disk.
+    With a RepoArchiveCache, the branch is first resolved to a commit SHA and the
+    download is skipped entirely when that commit is already cached.
+    """
+    if cache is not None:
+        sha = resolve_commit_sha(provider, base_url, org_name, repo_name, token, branch)
+        project = f"{base_url}/{org_name}/{repo_name}"
+        archive_path = cache.get(provider, project, sha)
+        if archive_path is None:
+            api_url, headers = build_archive_request(provider, base_url, org_name, repo_name, token, sha)
+            print(f"Downloading {provider} repo '{repo_name}' at {sha} from {api_url}")
+            with requests.get(api_url, headers=headers, stream=True) as response:
+                if response.status_code != 200:
+                    raise Exception(f"Failed to fetch zip: {response.status_code} {response.text}")
+                archive_path = cache.put_stream(provider, project, sha, response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE))
+        else:
+            print(f"Using cached {provider} repo '{repo_name}' at {sha}")
+        yield from iter_zip_members(archive_path, search_file, mode)
+        return
 
-    # Step 2: Extract to temp folder
-    temp_root = os.path.join(os.getcwd(), f"temp_{repo_name}")
-    if os.path.exists(temp_root):
-        shutil.rmtree(temp_root)
+    api_url, headers = build_archive_request(provider, base_url, org_name, repo_name, token, branch)
+
+    # Step 1: Download ZIP in chunks
+    print(f"Downloading {provider} repo '{repo_name}' from {api_url}")
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES) as spool:
+        with requests.get(api_url, headers=headers, stream=True) as response:
+            if response.status_code != 200:
+                raise Exception(f"Failed to fetch zip: {response.status_code} {response.text}")
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                spool.write(chunk)
+        spool.seek(0)
 
-    with zipfile.ZipFile(io.BytesIO(response.content)) as zip_ref:
-        zip_ref.extractall(temp_root)
+        # Step 2: Search zip members directly
+        yield from iter_zip_members(spool, search_file, mode)
 
-    extracted_dir = os.path.join(temp_root, os.listdir(temp_root)[0])  # first extracted folder
-    dag_files = []
+def iter_zip_members(archive, search_file, mode='filename'):
+    """
+    Yields {"dag_num", "filename", "full_path", "content"} for every member of a
+    repo archive whose file name matches search_file. The top-level folder that
+    GitHub/GitLab put in front of every path is dropped from full_path.
+    """
+    if mode.strip().lower() != 'filename':
+        return
+    name_pattern = re.compile(search_file, re.IGNORECASE)
     dag_num = 1
 
-    # Step 3: Walk and search files
-    for root, _, files in os.walk(extracted_dir):
-        for file in files:
-            file_path = os.path.join(root, file)
-            if mode.strip().lower() == 'filename' and re.search(search_file, file, re.IGNORECASE):
-                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    content = f.read()
-                dag_files.append({
-                    "dag_num": dag_num,
-                    "filename": file,
-                    "content": content
-                })
-                dag_num += 1
-
-    # Step 4: Cleanup temp folder
-    shutil.rmtree(temp_root)
-    return dag_files
+    with zipfile.ZipFile(archive) as zip_ref:
+        for info in zip_ref.infolist():
+            if info.is_dir():
+                continue
+            file = info.filename.rsplit('/', 1)[-1]
+            if not name_pattern.search(file):
+                continue
+            with zip_ref.open(info) as f:
+                content = io.TextIOWrapper(f, encoding='utf-8', errors='ignore').read()
+            yield {
+                "dag_num": dag_num,
+                "filename": file,
+                "full_path": info.filename.split('/', 1)[-1],
+                "content": content
+            }
+            dag_num += 1
+
+def process_git_repo(provider, base_url, org_name, repo_name, token, search_file, mode='filename', branch='main', cache=None):
+    """
+    Downloads and processes a GitHub/GitLab repo. 
+    Returns a list of matching files with content.
+    """
+    return list(iter_git_repo_files(provider, base_url, org_name, repo_name, token, search_file, mode, branch, cache))
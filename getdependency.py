@@ -3,6 +3,8 @@ import ast
 import sys
 import pkgutil
 import base64
+import ast_cache
+from module_index import ModuleIndex
 
 # Step 1: Setup standard Python modules
 STANDARD_MODULES = set([name for _, name, _ in pkgutil.iter_modules()] + list(sys.builtin_module_names))
@@ -14,7 +16,7 @@ def is_project_module(module_name):
 # Step 2: Extract imports from DAG content
 def extract_imports_from_code(content: str):
     imported_modules = set()
-    tree = ast.parse(content)
+    tree = ast_cache.parse(content)
 
     for node in ast.walk(tree):
         if isinstance(node, ast.Import):
@@ -28,14 +30,65 @@ def extract_imports_from_code(content: str):
     return list(imported_modules)
 
 # Step 3: List all .py files recursively in GitHub repo via API
-def list_all_python_files(api_url, token):
-    """Recursively list all .py files in a GitHub repo using GitHub API."""
+def list_all_python_files(api_url, token, cache=None):
+    """
+    List all .py files in a GitHub repo using GitHub API.
+    Uses a single recursive git-trees call; only falls back to the
+    per-directory contents crawl when GitHub truncates the tree.
+    With a RepoArchiveCache, the listing is cached per resolved HEAD commit.
+    """
     headers = {'Authorization': f'token {token}'}
+
+    with requests.Session() as session:
+        session.headers.update(headers)
+        ref = "HEAD"
+
+        if cache is not None:
+            response = session.get(f"{api_url}/commits/HEAD", headers={'Accept': 'application/vnd.github.sha'})
+            if response.status_code == 200:
+                ref = response.text.strip()
+                cached = cache.get_json('github', api_url, ref, suffix='.py_files.json')
+                if cached is not None:
+                    return cached
+            else:
+                print(f"Failed to resolve HEAD for {api_url}: {response.status_code}")
+
+        all_files = list_python_files_from_tree(session, api_url, ref)
+        if all_files is None:
+            all_files = crawl_python_files(session, api_url)
+
+    if cache is not None and ref != "HEAD":
+        cache.put_json('github', api_url, ref, all_files, suffix='.py_files.json')
+    return all_files
+
+def list_python_files_from_tree(session, api_url, ref="HEAD"):
+    """
+    Lists .py files with one recursive git-trees request.
+    Returns None when the tree is truncated or cannot be fetched.
+    """
+    url = f"{api_url}/git/trees/{ref}"
+    response = session.get(url, params={"recursive": 1})
+    if response.status_code != 200:
+        print(f"Failed to access {url}: {response.status_code}")
+        return None
+
+    data = response.json()
+    if data.get("truncated"):
+        print(f"Tree for {api_url} is truncated, falling back to directory crawl")
+        return None
+
+    return [
+        item['path'] for item in data.get("tree", [])
+        if item['type'] == 'blob' and item['path'].endswith('.py')
+    ]
+
+def crawl_python_files(session, api_url):
+    """Recursively list all .py files one directory at a time (contents API)."""
     all_files = []
 
     def traverse(path=""):
         url = f"{api_url}/contents/{path}"
-        response = requests.get(url, headers=headers)
+        response = session.get(url)
         if response.status_code != 200:
             print(f"Failed to access {url}: {response.status_code}")
             return
@@ -51,24 +104,24 @@ def list_all_python_files(api_url, token):
 
 # Step 4: Match imports to repo files
 def find_matching_files(imports, all_py_files):
+    module_index = ModuleIndex(all_py_files)
     matched_files = []
 
     for module in imports:
-        expected_path = module.replace(".", "/") + ".py"
-        for f in all_py_files:
-            if f.endswith(expected_path):
-                matched_files.append(f)
-                break
+        path = module_index.lookup(module)
+        if path:
+            matched_files.append(path)
     return matched_files
 
 # === FINAL FUNCTION: CALL THIS ===
-def get_dependent_files_from_dag_content(dag_content: str, api_url: str, token: str) -> list:
+def get_dependent_files_from_dag_content(dag_content: str, api_url: str, token: str, cache=None) -> list:
     """
     :param dag_content: string content of the DAG Python file
     :param api_url: GitHub API URL, e.g., https://api.github.com/repos/org/repo
     :param token: GitHub personal access token
+    :param cache: optional RepoArchiveCache, reuses the file listing while HEAD has not moved
     :return: list of dependent .py files used by this DAG
     """
     imports = extract_imports_from_code(dag_content)
-    all_py_files = list_all_python_files(api_url, token)
+    all_py_files = list_all_python_files(api_url, token, cache)
     return find_matching_files(imports, all_py_files)
@@ -1,67 +1,160 @@
+import threading
+from contextlib import nullcontext
 import requests
 from urllib.parse import urlparse, quote_plus
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+MAX_CONCURRENCY = 16  # global cap on in-flight requests across all repos
+PAGE_WORKERS = 8  # tree pages of one repo fetched side by side
+PER_PAGE = 100
+
+def make_session(token, pool_size=MAX_CONCURRENCY, retries=5, backoff_factor=0.5):
+    """
+    Shared keep-alive session for concurrent GitLab calls.
+    Retries 429/5xx with exponential backoff (honouring Retry-After).
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(["GET"]),
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.headers.update({"PRIVATE-TOKEN": token})
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.request_slots = threading.BoundedSemaphore(pool_size)
+    return session
+
+def _get(session, url, **kwargs):
+    """GET through the shared session, holding one of its request slots (if any) while in flight."""
+    with getattr(session, "request_slots", None) or nullcontext():
+        return (session or requests).get(url, **kwargs)
 
 def get_project_path_from_url(gitlab_url):
     parsed = urlparse(gitlab_url)
     return parsed.path.strip("/")
 
-def get_project_info(gitlab_base, project_path, token):
+def get_project_info(gitlab_base, project_path, token, session=None):
     encoded_path = quote_plus(project_path)
     url = f"{gitlab_base}/api/v4/projects/{encoded_path}"
-    headers = {"PRIVATE-TOKEN": token}
-    response = requests.get(url, headers=headers)
+    headers = {"PRIVATE-TOKEN": token} if token else {}
+    response = _get(session, url, headers=headers)
     if response.status_code == 200:
         return response.json()
     else:
         print(f"Error getting project info for {project_path}: {response.status_code}")
         return None
 
-def get_file_count(gitlab_base, project_id, default_branch, token):
+def get_file_count(gitlab_base, project_id, default_branch, token, session=None, page_workers=PAGE_WORKERS):
+    """
+    Number of files (blobs) in a repo's tree. The first page's X-Total-Pages
+    header tells how many pages there are, and the rest are fetched
+    concurrently; GitLab leaves the header out for very large trees, and then
+    the pages are walked one by one until a short page.
+    """
     url = f"{gitlab_base}/api/v4/projects/{project_id}/repository/tree"
-    headers = {"PRIVATE-TOKEN": token}
-    params = {
-        "recursive": True,
-        "ref": default_branch,
-        "per_page": 100
-    }
+    headers = {"PRIVATE-TOKEN": token} if token else {}
 
-    file_count = 0
-    page = 1
-    while True:
-        params["page"] = page
-        response = requests.get(url, headers=headers, params=params)
+    def fetch(page):
+        params = {
+            "recursive": True,
+            "ref": default_branch,
+            "per_page": PER_PAGE,
+            "page": page
+        }
+        response = _get(session, url, headers=headers, params=params)
         if response.status_code != 200:
             print(f"Error fetching files for project {project_id}: {response.status_code}")
             return None
-        data = response.json()
-        file_count += sum(1 for item in data if item["type"] == "blob")
-        if len(data) < 100:
-            break  # No more pages
-        page += 1
+        return response
 
-    return file_count
+    def blobs(items):
+        return sum(1 for item in items if item["type"] == "blob")
 
-# Input: GitLab URLs
-gitlab_urls = [
-    "https://gitw.cvshealth.com/pbm/dfm",
-    "https://gitw.cvshealth.com/analytics/reporting-engine"
-]
+    response = fetch(1)
+    if response is None:
+        return None
+    data = response.json()
+    file_count = blobs(data)
+    total_pages = response.headers.get("X-Total-Pages", "")
 
-gitlab_token = "your_gitlab_token"
-gitlab_base = "https://gitw.cvshealth.com"
+    if total_pages.isdigit():
+        if int(total_pages) > 1:
+            with ThreadPoolExecutor(max_workers=min(page_workers, int(total_pages) - 1)) as pool:
+                for response in pool.map(fetch, range(2, int(total_pages) + 1)):
+                    if response is None:
+                        return None
+                    file_count += blobs(response.json())
+        return file_count
+
+    page = 1
+    while len(data) == PER_PAGE:  # a short page is the last one
+        page += 1
+        response = fetch(page)
+        if response is None:
+            return None
+        data = response.json()
+        file_count += blobs(data)
+    return file_count
 
-# Main logic
-for url in gitlab_urls:
+def count_repo_files(session, gitlab_base, url):
+    """Project info + file count for one repo URL, using the shared session."""
     project_path = get_project_path_from_url(url)
-    project_info = get_project_info(gitlab_base, project_path, gitlab_token)
-    
-    if project_info:
-        project_id = project_info["id"]
-        default_branch = project_info.get("default_branch", "main")
-        file_count = get_file_count(gitlab_base, project_id, default_branch, gitlab_token)
-        
-        print(f"Repo: {project_path}")
-        print(f"  Project ID     : {project_id}")
-        print(f"  Default Branch : {default_branch}")
-        print(f"  File Count     : {file_count}")
+    project_info = get_project_info(gitlab_base, project_path, None, session)
+    if not project_info:
+        return {"project_path": project_path, "project_id": None, "default_branch": None, "file_count": None}
+
+    project_id = project_info["id"]
+    default_branch = project_info.get("default_branch", "main")
+    file_count = get_file_count(gitlab_base, project_id, default_branch, None, session)
+    return {
+        "project_path": project_path,
+        "project_id": project_id,
+        "default_branch": default_branch,
+        "file_count": file_count
+    }
+
+def iter_repo_file_counts(gitlab_base, gitlab_urls, token, max_concurrency=MAX_CONCURRENCY):
+    """
+    Counts files for many repos at once over one pooled session.
+    Yields each repo's result as soon as it finishes (not in input order).
+    A repo that fails (e.g. connection error) yields a result without a
+    project_id, like an HTTP error, and the other repos carry on.
+    """
+    with make_session(token, max_concurrency) as session:
+        with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+            futures = {pool.submit(count_repo_files, session, gitlab_base, url): url for url in gitlab_urls}
+            for future in as_completed(futures):
+                try:
+                    yield future.result()
+                except Exception as e:
+                    project_path = get_project_path_from_url(futures[future])
+                    print(f"Error counting files for {project_path}: {e}")
+                    yield {"project_path": project_path, "project_id": None, "default_branch": None, "file_count": None}
+
+if __name__ == "__main__":
+    # Input: GitLab URLs
+    gitlab_urls = [
+        "https://gitw.cvshealth.com/pbm/dfm",
+        "https://gitw.cvshealth.com/analytics/reporting-engine"
+    ]
+
+    gitlab_token = "your_gitlab_token"
+    gitlab_base = "https://gitw.cvshealth.com"
+
+    # Main logic
+    for result in iter_repo_file_counts(gitlab_base, gitlab_urls, gitlab_token):
+        if result["project_id"] is None:
+            continue
+
+        print(f"Repo: {result['project_path']}")
+        print(f"  Project ID     : {result['project_id']}")
+        print(f"  Default Branch : {result['default_branch']}")
+        print(f"  File Count     : {result['file_count']}")
         print("-" * 40)
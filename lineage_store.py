@@ -0,0 +1,200 @@
+import json
+import posixpath
+import re
+import sqlite3
+from collections import defaultdict
+import ast_cache
+from table_lineage import LINEAGE_FILE_PATTERN, extract_repo_lineage, file_values
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS lineage_files (
+    repo TEXT NOT NULL,
+    path TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    PRIMARY KEY (repo, path)
+);
+CREATE TABLE IF NOT EXISTS file_tables (
+    repo TEXT NOT NULL,
+    path TEXT NOT NULL,
+    table_name TEXT NOT NULL,
+    table_key TEXT NOT NULL,
+    table_base TEXT NOT NULL,
+    type TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_file_tables_key ON file_tables (table_key);
+CREATE INDEX IF NOT EXISTS idx_file_tables_base ON file_tables (table_base);
+CREATE INDEX IF NOT EXISTS idx_file_tables_path ON file_tables (repo, path);
+CREATE TABLE IF NOT EXISTS dag_files (
+    repo TEXT NOT NULL,
+    dag_path TEXT NOT NULL,
+    file_path TEXT NOT NULL,
+    PRIMARY KEY (repo, dag_path, file_path)
+);
+CREATE INDEX IF NOT EXISTS idx_dag_files_file ON dag_files (repo, file_path);
+"""
+
+def resolve_dependency_paths(dependencies, repo_paths_by_name):
+    """
+    Maps extractor dependencies to repo paths. Repo paths match as is; literals
+    such as 'sql/load.sql' or '/home/airflow/gcs/dags/sql/load.sql' match the
+    repo files they are a suffix of, or that are a suffix of them.
+    Templated literals ('{var}') cannot be resolved and are dropped.
+    """
+    resolved = set()
+    for dependency in dependencies:
+        candidates = repo_paths_by_name.get(posixpath.basename(dependency), ())
+        relative = dependency.lstrip('/')
+        for path in candidates:
+            if path == dependency or path.endswith('/' + relative) or relative.endswith('/' + path) or path == relative:
+                resolved.add(path)
+    return resolved
+
+def table_key(table_name):
+    """Lookup form of a table name: upper-cased, without quoting."""
+    return table_name.strip().replace('`', '').replace('"', '').replace('[', '').replace(']', '').upper()
+
+def table_base(table_name):
+    """Bare table name (the last segment of project.dataset.table / schema.table), in lookup form."""
+    return table_key(table_name).rsplit('.', 1)[-1]
+
+def values_fingerprint(values):
+    """Stable text form of resolved constants (set order and hash seeds do not leak in)."""
+    if not values:
+        return ""
+    try:
+        return json.dumps(values, sort_keys=True,
+                          default=lambda v: sorted(map(repr, v)) if isinstance(v, (set, frozenset)) else repr(v))
+    except TypeError:  # keys of mixed types cannot be sorted
+        return repr(sorted(values.items(), key=lambda item: repr(item[0])))
+
+class LineageStore:
+    """
+    Persistent DAG -> file -> table lineage in SQLite.
+
+    Tables per file are stored by content hash and only re-extracted for files
+    that changed since the last scan of the repo; the DAG -> file links come
+    from the dependency extractor (see DependencyGraphStore). Table lookups are
+    case-insensitive and served from an index, so queries never touch the repo.
+    """
+
+    def __init__(self, db_path="lineage.db"):
+        self.conn = sqlite3.connect(db_path)
+        self._add_table_base()
+        self.conn.executescript(SCHEMA)
+
+    def _add_table_base(self):
+        """Adds and fills file_tables.table_base in stores created before the column existed."""
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(file_tables)")]
+        if not columns or "table_base" in columns:
+            return
+        with self.conn:
+            self.conn.execute("ALTER TABLE file_tables ADD COLUMN table_base TEXT NOT NULL DEFAULT ''")
+            rows = self.conn.execute("SELECT rowid, table_name FROM file_tables").fetchall()
+            self.conn.executemany("UPDATE file_tables SET table_base = ? WHERE rowid = ?",
+                                  [(table_base(table_name), rowid) for rowid, table_name in rows])
+
+    def close(self):
+        self.conn.close()
+
+    def update(self, repo, all_files_objects, dag_dependencies, max_workers=None):
+        """
+        Brings the store up to date with a repo snapshot.
+        dag_dependencies is {dag_path: dependencies} as returned by
+        DependencyGraphStore.update / extract_dependencies_batch (None entries are skipped).
+        """
+        name_pattern = re.compile(LINEAGE_FILE_PATTERN, re.IGNORECASE)
+        files = {fobj['full_path']: fobj for fobj in all_files_objects if name_pattern.search(fobj['full_path'])}
+
+        repo_paths_by_name = defaultdict(list)
+        for path in files:
+            repo_paths_by_name[posixpath.basename(path)].append(path)
+        dag_files = {dag_path: resolve_dependency_paths(list(dependencies) + [dag_path], repo_paths_by_name)
+                     for dag_path, dependencies in dag_dependencies.items() if dependencies is not None}
+
+        # Resolved constants are part of a file's hash: a config or DAG change that
+        # alters the values a file is resolved with re-extracts that file too.
+        values_by_path = file_values(files.values(), dag_files)
+        file_hashes = {}
+        for path, fobj in files.items():
+            fingerprint = values_fingerprint(values_by_path.get(path))
+            file_hashes[path] = ast_cache.content_hash(fobj['content'] + "\0" + fingerprint if fingerprint else fobj['content'])
+
+        stored = dict(self.conn.execute("SELECT path, content_hash FROM lineage_files WHERE repo = ?", (repo,)))
+        changed = [path for path, content_hash in file_hashes.items() if stored.get(path) != content_hash]
+        removed = [path for path in stored if path not in file_hashes]
+        print(f"{repo}: re-extracting tables for {len(changed)} of {len(file_hashes)} files")
+        df = extract_repo_lineage([files[path] for path in changed], max_workers, values_by_path) if changed else None
+
+        with self.conn:
+            for path in changed + removed:
+                self.conn.execute("DELETE FROM file_tables WHERE repo = ? AND path = ?", (repo, path))
+            for path in removed:
+                self.conn.execute("DELETE FROM lineage_files WHERE repo = ? AND path = ?", (repo, path))
+            if df is not None:
+                matched = df[df["Type"] != "No Matches"]
+                self.conn.executemany(
+                    "INSERT INTO file_tables (repo, path, table_name, table_key, table_base, type) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    [(repo, path, table, table_key(table), table_base(table), tag)
+                     for path, table, tag in zip(matched["FilePath"].astype(str), matched["Table Name"].astype(str),
+                                                 matched["Type"].astype(str))]
+                )
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO lineage_files (repo, path, content_hash) VALUES (?, ?, ?)",
+                [(repo, path, file_hashes[path]) for path in changed]
+            )
+
+            self.conn.execute("DELETE FROM dag_files WHERE repo = ?", (repo,))
+            links = [(repo, dag_path, file_path) for dag_path, paths in dag_files.items() for file_path in paths]
+            self.conn.executemany("INSERT OR IGNORE INTO dag_files (repo, dag_path, file_path) VALUES (?, ?, ?)", links)
+
+    def dags_for_table(self, table_name, direction=None):
+        """
+        DAGs whose files reference table_name, as (repo, dag_path, file_path, type) rows.
+        A qualified name matches that name only; a bare name (T_ORDERS) also
+        matches every qualified reference to it (DS.T_ORDERS, PROJ.DS.T_ORDERS).
+        direction 'output' / 'input' keeps writers / readers (unresolved tags included).
+        """
+        query = ("SELECT DISTINCT d.repo, d.dag_path, d.file_path, t.type FROM file_tables t "
+                 "JOIN dag_files d ON d.repo = t.repo AND d.file_path = t.path "
+                 "WHERE (t.table_key = ? OR t.table_base = ?)")
+        key = table_key(table_name)
+        params = [key, key]
+        if direction:
+            query += " AND lower(t.type) LIKE ?"
+            params.append(direction.lower() + '%')
+        return self.conn.execute(query + " ORDER BY d.repo, d.dag_path", params).fetchall()
+
+    def dags_writing(self, table_name):
+        return sorted({(repo, dag_path) for repo, dag_path, _, _ in self.dags_for_table(table_name, 'output')})
+
+    def dags_reading(self, table_name):
+        return sorted({(repo, dag_path) for repo, dag_path, _, _ in self.dags_for_table(table_name, 'input')})
+
+    def tables_for_dag(self, repo, dag_path, direction=None):
+        """(table_name, type, file_path) rows reached from a DAG through its dependent files."""
+        query = ("SELECT DISTINCT t.table_name, t.type, t.path FROM dag_files d "
+                 "JOIN file_tables t ON t.repo = d.repo AND t.path = d.file_path "
+                 "WHERE d.repo = ? AND d.dag_path = ?")
+        params = [repo, dag_path]
+        if direction:
+            query += " AND lower(t.type) LIKE ?"
+            params.append(direction.lower() + '%')
+        return self.conn.execute(query + " ORDER BY t.table_name", params).fetchall()
+
+    def upstream_tables(self, repo, dag_path):
+        return sorted({table for table, _, _ in self.tables_for_dag(repo, dag_path, 'input')})
+
+    def downstream_tables(self, repo, dag_path):
+        return sorted({table for table, _, _ in self.tables_for_dag(repo, dag_path, 'output')})
+
+def scan_repo_lineage(lineage_store, graph_store, repo, all_files_objects, dag_paths, changed_paths=None,
+                      commit_sha=None, max_workers=None):
+    """
+    One incremental scan: refreshes the DAG dependency graph (only affected DAGs
+    are re-extracted) and then the table lineage (only changed files are re-read).
+    """
+    all_files_objects = list(all_files_objects)
+    dag_dependencies = graph_store.update(repo, all_files_objects, dag_paths, changed_paths, commit_sha, max_workers)
+    lineage_store.update(repo, all_files_objects, dag_dependencies, max_workers)
+    return dag_dependencies
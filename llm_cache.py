@@ -0,0 +1,200 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import tokenize
+from collections import OrderedDict
+from cleaning import working_clean_py_code
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "llm_results")
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024  # 1 GB
+
+def normalize_chunk(text):
+    """
+    Chunk text with comments, docstrings, blank lines and trailing spaces removed
+    (the cleaning.py cleaner), so cosmetic edits map to the same cache entry.
+    Fragments that do not tokenize are only stripped of blank lines and trailing spaces.
+    """
+    try:
+        return working_clean_py_code(text)
+    except (tokenize.TokenError, SyntaxError, IndentationError):
+        return '\n'.join(line.rstrip() for line in text.splitlines() if line.strip())
+
+def chunk_key(text, namespace=""):
+    """Cache key of a chunk: sha256 over the namespace (model, prompt version, ...) and the normalized text."""
+    normalized = normalize_chunk(text)
+    return hashlib.sha256(f"{namespace}\0{normalized}".encode('utf-8', 'surrogatepass')).hexdigest()
+
+class MemoryBackend:
+    """In-process LRU of JSON-serializable results, bounded by their serialized size."""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (size, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, value):
+        size = len(json.dumps(value))
+        with self._lock:
+            if key in self._entries:
+                self.total_bytes -= self._entries.pop(key)[0]
+            self._entries[key] = (size, value)
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+                _, (old_size, _) = self._entries.popitem(last=False)
+                self.total_bytes -= old_size
+                self.evictions += 1
+
+    def stats(self):
+        return {"entries": len(self._entries), "bytes": self.total_bytes, "evictions": self.evictions}
+
+class DiskBackend:
+    """
+    One JSON file per result under cache_dir, shared across runs and processes.
+    Writes are atomic (temp file + rename); least recently used entries (by
+    mtime) are evicted once the directory grows past max_bytes.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.total_bytes = sum(size for _, size, _ in self._entries())
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + '.json')
+
+    def _entries(self):
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            yield stat.st_mtime, stat.st_size, path
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                value = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        os.utime(path)  # mark as recently used
+        return value
+
+    def put(self, key, value):
+        data = json.dumps(value).encode('utf-8')
+        path = self._path(key)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            try:
+                replaced = os.stat(path).st_size  # overwriting an entry frees its old bytes
+            except FileNotFoundError:
+                replaced = 0
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        with self._lock:
+            self.total_bytes += len(data) - replaced
+            if self.total_bytes > self.max_bytes:
+                self.evict(keep=path)
+
+    def evict(self, keep=None):
+        """Removes least recently used entries until the cache is back under 90% of max_bytes."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        for _, size, path in entries:
+            if total <= target:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            self.evictions += 1
+        self.total_bytes = total
+
+    def stats(self):
+        return {"bytes": self.total_bytes, "evictions": self.evictions}
+
+class LLMResultCache:
+    """
+    Content-addressed cache for LLM / embedding results of code chunks.
+    Keys are hashes of the normalized chunk, so the same DAG boilerplate seen in
+    another repo or a later run is served without calling the model again.
+    namespace should change whenever the model or prompt does.
+    backend is any object with get(key) / put(key, value); DiskBackend by default.
+    """
+
+    def __init__(self, backend=None, namespace=""):
+        self.backend = backend if backend is not None else DiskBackend()
+        self.namespace = namespace
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, chunk, compute):
+        """Returns the cached result for chunk, or compute(chunk) stored for next time."""
+        key = chunk_key(chunk, self.namespace)
+        value = self.backend.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        self.misses += 1
+        value = compute(chunk)
+        if value is not None:
+            self.backend.put(key, value)
+        return value
+
+    def map(self, chunks, compute):
+        """
+        Results for a list of chunks, in order. Chunks that normalize to the same
+        text are computed once, even within the batch.
+        """
+        results = []
+        computed = {}
+        for chunk in chunks:
+            key = chunk_key(chunk, self.namespace)
+            if key in computed:
+                self.hits += 1
+                results.append(computed[key])
+                continue
+            value = self.backend.get(key)
+            if value is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+                value = compute(chunk)
+                if value is not None:
+                    self.backend.put(key, value)
+            computed[key] = value
+            results.append(value)
+        return results
+
+    def stats(self):
+        stats = {"hits": self.hits, "misses": self.misses}
+        if hasattr(self.backend, 'stats'):
+            stats.update(self.backend.stats())
+        return stats
@@ -0,0 +1,27 @@
+class ModuleIndex:
+    """
+    Reverse index from dotted module names to repo .py paths.
+    Every dotted suffix of a file's path is registered, so 'utils', 'common.utils'
+    and 'dags.common.utils' all map to 'dags/common/utils.py'. Lookups are a single
+    dict access and only ever match whole path components.
+    """
+
+    def __init__(self, paths=()):
+        self.by_module = {}
+        for path in paths:
+            self.add(path)
+
+    def add(self, path):
+        if not path.endswith('.py'):
+            return
+        parts = [p for p in path[:-3].replace('\\', '/').split('/') if p]
+        if parts and parts[-1] == '__init__':
+            parts = parts[:-1]  # a package resolves to its __init__.py
+        for i in range(len(parts)):
+            # first registered path wins, same as the old "first match" scan
+            self.by_module.setdefault('.'.join(parts[i:]), path)
+
+    def lookup(self, module_name):
+        if not module_name:
+            return None
+        return self.by_module.get(module_name)
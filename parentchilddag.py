@@ -1 +1,478 @@
-a
+import ast
+from collections import namedtuple
+import ast_cache
+from constant_eval import Unresolved, evaluate
+from constant_propagation import ModuleScopes, OrderedScopeVisitor
+from is_dag_file import classify_dag_source
+
+DAG_CLASSES = {"DAG"}
+DAG_DECORATORS = {"dag"}
+TRIGGER_OPERATORS = {"TriggerDagRunOperator"}  # this DAG -> trigger_dag_id
+SENSOR_OPERATORS = {"ExternalTaskSensor", "ExternalTaskSensorAsync"}  # external_dag_id -> this DAG
+MARKER_OPERATORS = {"ExternalTaskMarker"}  # this DAG -> external_dag_id
+DATASET_CLASSES = {"Dataset", "Asset"}
+DATASET_CONDITIONS = {"DatasetAll", "DatasetAny", "AssetAll", "AssetAny"}
+SCHEDULE_ARGS = ("schedule", "schedule_interval")
+
+# dags: {dag_id: lineno}; edges: [(upstream, downstream, kind)];
+# produces / consumes: {dag_id: {dataset uri}}; unresolved: [(lineno, kind)]
+DagRelations = namedtuple("DagRelations", ["path", "dags", "edges", "produces", "consumes", "unresolved"])
+
+def _callee_name(func):
+    if isinstance(func, ast.Name):
+        return func.id
+    if isinstance(func, ast.Attribute):
+        return func.attr
+    return None
+
+def _keyword(call, name):
+    return next((keyword.value for keyword in call.keywords if keyword.arg == name), None)
+
+class DagRelationExtractor(OrderedScopeVisitor):
+    """
+    DAGs a file defines and how they relate to other DAGs: TriggerDagRunOperator,
+    ExternalTaskSensor / ExternalTaskMarker and Dataset outlets / schedules.
+    DAG ids and targets are resolved statically with the constants known at
+    that point of the file (see constant_propagation.OrderedScopeVisitor); ids
+    that stay unknown are reported, not guessed.
+    A task belongs to the DAG of its dag= argument, the enclosing with DAG(...)
+    or @dag function, or else the DAG defined last before it.
+    """
+
+    def __init__(self, path, scopes):
+        self.path = path
+        self.current_file = path
+        self.scopes = scopes
+        self.variable_map = {}
+        self.dags = {}
+        self.edges = []
+        self.produces = {}
+        self.consumes = {}
+        self.unresolved = []
+        self.dag_vars = {}  # {variable_name: dag_id}
+        self.dataset_vars = {}  # {variable_name: [uri]}
+        self.current = []  # stack of enclosing DAG ids
+        self.last_dag = None
+        self._dag_calls = {}  # id(DAG(...) node) -> dag_id, so a call is defined once
+        self._pending = []  # relations seen before any DAG: (kind, target, lineno)
+
+    def extract(self, source):
+        tree = ast_cache.parse(source)
+        self.visit(tree)
+        if self._pending:
+            # tasks built before their DAG (e.g. in helpers) belong to it if it is the only one
+            owner = next(iter(self.dags)) if len(self.dags) == 1 else None
+            for kind, target, lineno in self._pending:
+                if owner is None:
+                    self.unresolved.append((lineno, kind))
+                else:
+                    self._relate(owner, kind, target)
+        return DagRelations(self.path, self.dags, self.edges, self.produces, self.consumes, self.unresolved)
+
+    def _string(self, node):
+        if node is None:
+            return None
+        try:
+            value = evaluate(node, self.variable_map)
+        except Unresolved:
+            return None
+        return value if isinstance(value, str) else None
+
+    def _dataset_uris(self, node):
+        """Dataset URIs of a schedule / outlets expression: Dataset(...), lists, & / |, DatasetAll/Any, names."""
+        if isinstance(node, (ast.List, ast.Tuple, ast.Set)):
+            return [uri for item in node.elts for uri in self._dataset_uris(item)]
+        if isinstance(node, ast.BinOp) and isinstance(node.op, (ast.BitAnd, ast.BitOr)):
+            return self._dataset_uris(node.left) + self._dataset_uris(node.right)
+        if isinstance(node, ast.Name):
+            return list(self.dataset_vars.get(node.id, ()))
+        if isinstance(node, ast.Call):
+            name = _callee_name(node.func)
+            if name in DATASET_CONDITIONS:
+                return [uri for arg in node.args for uri in self._dataset_uris(arg)]
+            if name in DATASET_CLASSES:
+                uri = self._string(node.args[0] if node.args else _keyword(node, "uri") or _keyword(node, "name"))
+                if uri is None:
+                    self.unresolved.append((node.lineno, "dataset"))
+                return [uri] if uri is not None else []
+        return []
+
+    def _define_dag(self, call, dag_id_node, default_id=None):
+        dag_id = self._dag_calls.get(id(call))
+        if dag_id is not None:
+            return dag_id
+        dag_id = self._string(dag_id_node) or default_id
+        if dag_id is None:
+            dag_id = f"{self.path}:{call.lineno}"  # dynamic id, kept as a node of its own
+            self.unresolved.append((call.lineno, "dag_id"))
+        self._dag_calls[id(call)] = dag_id
+        self.dags.setdefault(dag_id, call.lineno)
+        self.last_dag = dag_id
+        for arg in SCHEDULE_ARGS if isinstance(call, ast.Call) else ():  # a bare @dag has no arguments
+            schedule = _keyword(call, arg)
+            if schedule is not None:
+                uris = self._dataset_uris(schedule)
+                if uris:
+                    self.consumes.setdefault(dag_id, set()).update(uris)
+        return dag_id
+
+    def _dag_call_id(self, node):
+        """dag_id of a DAG(...) constructor call, or None for any other expression."""
+        if isinstance(node, ast.Call) and _callee_name(node.func) in DAG_CLASSES:
+            return self._define_dag(node, node.args[0] if node.args else _keyword(node, "dag_id"))
+        return None
+
+    def _owner(self, call):
+        dag = _keyword(call, "dag")
+        if isinstance(dag, ast.Name) and dag.id in self.dag_vars:
+            return self.dag_vars[dag.id]
+        if self.current:
+            return self.current[-1]
+        return self.last_dag
+
+    def _relate(self, owner, kind, target):
+        if kind == "outlet":
+            self.produces.setdefault(owner, set()).update(target)
+        elif kind == "sensor":
+            self.edges.append((target, owner, kind))
+        else:
+            self.edges.append((owner, target, kind))
+
+    def _add_relation(self, call, kind, target):
+        owner = self._owner(call)
+        if owner is None:
+            self._pending.append((kind, target, call.lineno))
+        else:
+            self._relate(owner, kind, target)
+
+    def visit_With(self, node):
+        entered = 0
+        for item in node.items:
+            dag_id = self._dag_call_id(item.context_expr)
+            if dag_id is not None:
+                if isinstance(item.optional_vars, ast.Name):
+                    self.dag_vars[item.optional_vars.id] = dag_id
+                self.current.append(dag_id)
+                entered += 1
+        self.generic_visit(node)
+        del self.current[len(self.current) - entered:]
+
+    visit_AsyncWith = visit_With
+
+    def visit_Assign(self, node):
+        dag_id = self._dag_call_id(node.value)
+        uris = self._dataset_uris(node.value) if dag_id is None else []
+        for target in node.targets:
+            if isinstance(target, ast.Name):
+                if dag_id is not None:
+                    self.dag_vars[target.id] = dag_id
+                elif uris:
+                    self.dataset_vars[target.id] = uris
+                else:
+                    self.dag_vars.pop(target.id, None)
+                    self.dataset_vars.pop(target.id, None)
+        self.generic_visit(node)
+
+    def visit_FunctionDef(self, node):
+        dag_id = None
+        for decorator in node.decorator_list:
+            call = decorator if isinstance(decorator, ast.Call) else None
+            if _callee_name(call.func if call else decorator) in DAG_DECORATORS:
+                dag_id = self._define_dag(call or decorator, _keyword(call, "dag_id") if call else None, node.name)
+        if dag_id is not None:
+            self.current.append(dag_id)
+        self.generic_visit(node)
+        if dag_id is not None:
+            self.current.pop()
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_Call(self, node):
+        name = _callee_name(node.func)
+        if name in DAG_CLASSES:
+            self._dag_call_id(node)
+        elif name in TRIGGER_OPERATORS or name in SENSOR_OPERATORS or name in MARKER_OPERATORS:
+            argument = "trigger_dag_id" if name in TRIGGER_OPERATORS else "external_dag_id"
+            kind = "trigger" if name in TRIGGER_OPERATORS else "sensor" if name in SENSOR_OPERATORS else "marker"
+            target = self._string(_keyword(node, argument))
+            if target is None:
+                self.unresolved.append((node.lineno, kind))
+            else:
+                self._add_relation(node, kind, target)
+        outlets = _keyword(node, "outlets")
+        if outlets is not None:
+            uris = self._dataset_uris(outlets)
+            if uris:
+                self._add_relation(node, "outlet", uris)
+        self.generic_visit(node)
+
+def extract_dag_relations(path, source, scopes):
+    """DagRelations of one DAG file; scopes is the repo's ModuleScopes."""
+    return DagRelationExtractor(path, scopes).extract(source)
+
+def _members(bits, components):
+    """Nodes of the components set in a bitset."""
+    nodes = []
+    while bits:
+        low = bits & -bits
+        nodes.extend(components[low.bit_length() - 1])
+        bits ^= low
+    return nodes
+
+class DagGraph:
+    """
+    Repo-wide DAG-to-DAG graph. Edges point from the upstream DAG to the one it
+    triggers or that waits for / consumes it; kinds are trigger, sensor, marker
+    and dataset. Target DAGs outside the scanned files are kept as nodes.
+
+    Queries run on an index built on first use (and after any change): cycles
+    are collapsed into strongly connected components, components get a
+    topological level (longest distance from a root), and every component keeps
+    its ancestors and descendants as a bitset, so reachability is one bit test
+    and a descendant list costs its own size.
+    """
+
+    def __init__(self):
+        self.dag_paths = {}  # {dag_id: [paths]}
+        self.children = {}  # {dag_id: {dag_id}}
+        self.parents = {}
+        self.edge_kinds = {}  # {(upstream, downstream): {kind}}
+        self.producers = {}  # {uri: {dag_id}}
+        self.consumers = {}
+        self.unresolved = []  # [(path, lineno, kind)]
+        self._index = None
+
+    def add_dag(self, dag_id, path=None):
+        self.children.setdefault(dag_id, set())
+        self.parents.setdefault(dag_id, set())
+        if path is not None and path not in self.dag_paths.setdefault(dag_id, []):
+            self.dag_paths[dag_id].append(path)
+        self._index = None
+
+    def add_edge(self, upstream, downstream, kind):
+        self.add_dag(upstream)
+        self.add_dag(downstream)
+        self.children[upstream].add(downstream)
+        self.parents[downstream].add(upstream)
+        self.edge_kinds.setdefault((upstream, downstream), set()).add(kind)
+
+    def add_relations(self, relations):
+        for dag_id in relations.dags:
+            self.add_dag(dag_id, relations.path)
+        for upstream, downstream, kind in relations.edges:
+            self.add_edge(upstream, downstream, kind)
+        for dag_id, uris in relations.produces.items():
+            for uri in uris:
+                self.producers.setdefault(uri, set()).add(dag_id)
+                for consumer in self.consumers.get(uri, ()):
+                    self.add_edge(dag_id, consumer, "dataset")
+        for dag_id, uris in relations.consumes.items():
+            for uri in uris:
+                self.consumers.setdefault(uri, set()).add(dag_id)
+                for producer in self.producers.get(uri, ()):
+                    self.add_edge(producer, dag_id, "dataset")
+        self.unresolved.extend((relations.path, lineno, kind) for lineno, kind in relations.unresolved)
+
+    def _strongly_connected(self, nodes):
+        """Tarjan's algorithm without recursion; components come out sinks first."""
+        index_of, lowlink, on_stack = {}, {}, set()
+        stack, components = [], []
+        for root in nodes:
+            if root in index_of:
+                continue
+            work = [(root, iter(sorted(self.children[root])))]
+            index_of[root] = lowlink[root] = len(index_of)
+            stack.append(root)
+            on_stack.add(root)
+            while work:
+                node, children = work[-1]
+                child = next(children, None)
+                if child is not None:
+                    if child not in index_of:
+                        index_of[child] = lowlink[child] = len(index_of)
+                        stack.append(child)
+                        on_stack.add(child)
+                        work.append((child, iter(sorted(self.children[child]))))
+                    elif child in on_stack:
+                        lowlink[node] = min(lowlink[node], index_of[child])
+                    continue
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+                if lowlink[node] == index_of[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(sorted(component))
+        return components
+
+    def _build_index(self):
+        components = self._strongly_connected(sorted(self.children))
+        component_of = {node: i for i, members in enumerate(components) for node in members}
+        component_children = [set() for _ in components]
+        component_parents = [set() for _ in components]
+        cyclic = [len(members) > 1 for members in components]
+        for upstream, downstreams in self.children.items():
+            for downstream in downstreams:
+                a, b = component_of[upstream], component_of[downstream]
+                if a == b:
+                    cyclic[a] = True
+                else:
+                    component_children[a].add(b)
+                    component_parents[b].add(a)
+
+        # Tarjan numbers sinks first, so every child has a lower index than its parents
+        descendants = [0] * len(components)
+        for c in range(len(components)):
+            bits = 1 << c if cyclic[c] else 0
+            for child in component_children[c]:
+                bits |= (1 << child) | descendants[child]
+            descendants[c] = bits
+        # DAGs under each descendant bitset: one per bit, plus the extra members of cycles
+        multi = 0
+        for c, members in enumerate(components):
+            if len(members) > 1:
+                multi |= 1 << c
+        descendant_counts = [(bits & ~multi).bit_count() + len(_members(bits & multi, components))
+                             for bits in descendants]
+        ancestors = [0] * len(components)
+        levels = [0] * len(components)
+        for c in reversed(range(len(components))):
+            bits = 1 << c if cyclic[c] else 0
+            for parent in component_parents[c]:
+                bits |= (1 << parent) | ancestors[parent]
+                levels[c] = max(levels[c], levels[parent] + 1)
+            ancestors[c] = bits
+
+        self._index = {
+            "components": components,
+            "component_of": component_of,
+            "children": component_children,
+            "parents": component_parents,
+            "cyclic": cyclic,
+            "descendants": descendants,
+            "descendant_counts": descendant_counts,
+            "ancestors": ancestors,
+            "levels": levels,
+        }
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._build_index()
+        return self._index
+
+    def _related(self, dag_id, direction):
+        index = self.index
+        c = index["component_of"].get(dag_id)
+        if c is None:
+            return []
+        return sorted(node for node in _members(index[direction][c], index["components"]) if node != dag_id
+                      or index["cyclic"][c])
+
+    def descendants(self, dag_id):
+        """Every DAG dag_id starts, directly or through others (itself too if it is on a cycle)."""
+        return self._related(dag_id, "descendants")
+
+    def ancestors(self, dag_id):
+        """Every DAG that leads to dag_id, directly or through others."""
+        return self._related(dag_id, "ancestors")
+
+    def is_upstream(self, upstream, downstream):
+        index = self.index
+        a, b = index["component_of"].get(upstream), index["component_of"].get(downstream)
+        return a is not None and b is not None and bool(index["descendants"][a] >> b & 1)
+
+    def levels(self):
+        """{dag_id: topological level}; roots are 0, DAGs on one cycle share a level."""
+        index = self.index
+        return {node: index["levels"][c] for node, c in index["component_of"].items()}
+
+    def level_widths(self):
+        """{level: number of DAGs}, how many DAGs each wave of a trigger chain can run side by side."""
+        widths = {}
+        for level in self.levels().values():
+            widths[level] = widths.get(level, 0) + 1
+        return dict(sorted(widths.items()))
+
+    def roots(self):
+        index = self.index
+        return sorted(node for c, members in enumerate(index["components"])
+                      if not index["parents"][c] for node in members)
+
+    def cycles(self):
+        """DAGs that (transitively) trigger themselves, one sorted list per cycle."""
+        index = self.index
+        return [members for c, members in enumerate(index["components"]) if index["cyclic"][c]]
+
+    def critical_path(self, durations=None):
+        """
+        Longest chain of DAGs, as (dag_ids, total). durations is {dag_id: runtime}
+        (minutes, say); DAGs without one count 1, so by default the path is the
+        chain with the most DAGs. A cycle on the path contributes all its members.
+        """
+        durations = durations or {}
+        index = self.index
+        components = index["components"]
+        best = [0] * len(components)
+        previous = [None] * len(components)
+        for c in reversed(range(len(components))):
+            before = max(index["parents"][c], key=lambda parent: (best[parent], -parent), default=None)
+            best[c] = sum(durations.get(node, 1) for node in components[c]) + (best[before] if before is not None else 0)
+            previous[c] = before
+        if not components:
+            return [], 0
+        end = max(range(len(components)), key=lambda c: (best[c], -c))
+        path = []
+        c = end
+        while c is not None:
+            path[:0] = components[c]
+            c = previous[c]
+        return path, best[end]
+
+    def _descendant_count(self, dag_id):
+        index = self.index
+        c = index["component_of"].get(dag_id)
+        return index["descendant_counts"][c] if c is not None else 0
+
+    def fan_out(self, dag_id):
+        """{"children": DAGs it starts directly, "descendants": DAGs it starts in total}."""
+        return {"children": len(self.children.get(dag_id, ())), "descendants": self._descendant_count(dag_id)}
+
+    def fan_out_report(self, top=None):
+        """[(dag_id, children, descendants)] for DAGs that start others, largest chains first."""
+        report = [(dag_id, len(children), self._descendant_count(dag_id))
+                  for dag_id, children in self.children.items() if children]
+        report.sort(key=lambda row: (-row[2], -row[1], row[0]))
+        return report[:top] if top else report
+
+def build_dag_graph(all_files_objects, scopes=None):
+    """
+    DagGraph of every DAG file in a repo snapshot ([{"full_path", "content"}]),
+    with trigger, sensor, marker and dataset edges. A DAG file is one is_dag_file
+    detects, or any other airflow file in which the extractor finds a DAG
+    (the quick classifier misses e.g. dag = DAG(dag_id=...)).
+    """
+    sources = {fobj['full_path']: fobj['content'] for fobj in all_files_objects
+               if fobj['full_path'].endswith('.py')}
+    scopes = scopes if scopes is not None else ModuleScopes(sources)
+    graph = DagGraph()
+    for path in sorted(sources):
+        source = sources[path]
+        if 'airflow' not in source:
+            continue
+        detected = classify_dag_source(source).startswith("DAG detected")
+        try:
+            relations = extract_dag_relations(path, source, scopes)
+        except (SyntaxError, ValueError) as e:
+            if detected:
+                print(f"Skipping {path} due to parse error: {e}")
+            continue
+        if detected or relations.dags:
+            graph.add_relations(relations)
+    return graph
@@ -0,0 +1,158 @@
+import os
+import json
+import hashlib
+import tempfile
+import requests
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "repo_archives")
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024 * 1024  # 5 GB
+
+def resolve_commit_sha(provider, base_url, org_name, repo_name, token, branch='main'):
+    """
+    Cheap ref lookup: returns the commit SHA a branch (or tag/ref) points to,
+    without downloading anything else.
+    """
+    if provider.lower() == 'github':
+        url = f"{base_url}/repos/{org_name}/{repo_name}/commits/{branch}"
+        headers = {
+            "Authorization": f"token {token}",
+            "Accept": "application/vnd.github.sha"
+        }
+        response = requests.get(url, headers=headers)
+        if response.status_code != 200:
+            raise Exception(f"Failed to resolve {branch}: {response.status_code} {response.text}")
+        return response.text.strip()
+    elif provider.lower() == 'gitlab':
+        encoded_project = f"{org_name}/{repo_name}".replace("/", "%2F")
+        url = f"{base_url}/api/v4/projects/{encoded_project}/repository/commits/{branch}"
+        headers = {"PRIVATE-TOKEN": token}
+        response = requests.get(url, headers=headers)
+        if response.status_code != 200:
+            raise Exception(f"Failed to resolve {branch}: {response.status_code} {response.text}")
+        return response.json()["id"]
+    else:
+        raise ValueError("Unsupported provider. Use 'github' or 'gitlab'.")
+
+def fetch_changed_paths(provider, base_url, org_name, repo_name, token, base_sha, head_sha):
+    """
+    Returns the set of paths added, modified, removed or renamed between two commits,
+    or None when the provider cannot give a complete list (e.g. GitHub caps compare
+    results at 300 files), in which case callers should diff content hashes instead.
+    """
+    if provider.lower() == 'github':
+        url = f"{base_url}/repos/{org_name}/{repo_name}/compare/{base_sha}...{head_sha}"
+        headers = {
+            "Authorization": f"token {token}",
+            "Accept": "application/vnd.github.v3+json"
+        }
+        response = requests.get(url, headers=headers)
+        if response.status_code != 200:
+            raise Exception(f"Failed to compare {base_sha}...{head_sha}: {response.status_code} {response.text}")
+        files = response.json().get("files", [])
+        if len(files) >= 300:
+            return None
+        changed = set()
+        for item in files:
+            changed.add(item["filename"])
+            if item.get("previous_filename"):
+                changed.add(item["previous_filename"])
+        return changed
+    elif provider.lower() == 'gitlab':
+        encoded_project = f"{org_name}/{repo_name}".replace("/", "%2F")
+        url = f"{base_url}/api/v4/projects/{encoded_project}/repository/compare"
+        headers = {"PRIVATE-TOKEN": token}
+        response = requests.get(url, headers=headers, params={"from": base_sha, "to": head_sha})
+        if response.status_code != 200:
+            raise Exception(f"Failed to compare {base_sha}...{head_sha}: {response.status_code} {response.text}")
+        data = response.json()
+        if data.get("compare_timeout"):
+            return None
+        changed = set()
+        for diff in data.get("diffs", []):
+            changed.add(diff["old_path"])
+            changed.add(diff["new_path"])
+        return changed
+    else:
+        raise ValueError("Unsupported provider. Use 'github' or 'gitlab'.")
+
+class RepoArchiveCache:
+    """
+    Local on-disk cache of repo archives (and other per-commit artifacts such as
+    file listings), keyed by (provider, project, commit SHA).
+    A commit never changes, so entries never go stale; the cache is only bounded
+    by size, evicting the least recently used entries first.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _path(self, provider, project, sha, suffix):
+        key = hashlib.sha256(f"{provider.lower()}\0{project}\0{sha}".encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, key + suffix)
+
+    def get(self, provider, project, sha, suffix='.zip'):
+        """Returns the cached file path, or None on a miss."""
+        path = self._path(provider, project, sha, suffix)
+        if os.path.exists(path):
+            os.utime(path)  # mark as recently used
+            self.hits += 1
+            return path
+        self.misses += 1
+        return None
+
+    def put_stream(self, provider, project, sha, chunks, suffix='.zip'):
+        """Writes an iterable of byte chunks into the cache and returns the path."""
+        path = self._path(provider, project, sha, suffix)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.evict(keep=path)
+        return path
+
+    def get_json(self, provider, project, sha, suffix='.json'):
+        path = self.get(provider, project, sha, suffix)
+        if path is None:
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def put_json(self, provider, project, sha, value, suffix='.json'):
+        data = json.dumps(value).encode('utf-8')
+        return self.put_stream(provider, project, sha, [data], suffix)
+
+    def evict(self, keep=None):
+        """Removes least recently used entries until the cache fits in max_bytes."""
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.tmp'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            os.remove(path)
+            total -= size
+            self.evictions += 1
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions}
@@ -0,0 +1,209 @@
+import hashlib
+import json
+import os
+import pyarrow as pa
+import pyarrow.parquet as pq
+from spanner_loader import LoadCheckpoint, commit_batches, MAX_MUTATIONS_PER_COMMIT, MAX_BATCH_BYTES, MAX_WORKERS
+from spanner_partitioned_export import export_table_partitioned, MAX_WORKERS as EXPORT_WORKERS
+
+RECORD_BATCH_ROWS = 50000
+
+# Spanner type code -> Arrow type. The Spanner type name is also kept in the
+# field metadata so the importer knows how each column was typed.
+SPANNER_TO_ARROW = {
+    "STRING": pa.string(),
+    "INT64": pa.int64(),
+    "FLOAT64": pa.float64(),
+    "FLOAT32": pa.float32(),
+    "BOOL": pa.bool_(),
+    "BYTES": pa.binary(),
+    "DATE": pa.date32(),
+    "TIMESTAMP": pa.timestamp("us", tz="UTC"),
+    "NUMERIC": pa.decimal128(38, 9),
+    "JSON": pa.string(),
+}
+
+def _type_name(spanner_type):
+    code = spanner_type.code
+    return getattr(code, "name", str(code))
+
+def arrow_type(spanner_type):
+    name = _type_name(spanner_type)
+    if name == "ARRAY":
+        return pa.list_(arrow_type(spanner_type.array_element_type))
+    return SPANNER_TO_ARROW.get(name, pa.string())
+
+def arrow_schema(fields):
+    return pa.schema([
+        pa.field(field.name, arrow_type(field.type_), metadata={b"spanner_type": _type_name(field.type_).encode()})
+        for field in fields
+    ])
+
+def _to_record_batch(columns, schema):
+    arrays = []
+    for values, field in zip(columns, schema):
+        if field.metadata and field.metadata.get(b"spanner_type") == b"JSON":
+            values = [v if v is None or isinstance(v, str) else json.dumps(v) for v in values]
+        arrays.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+def iter_record_batches(results, batch_rows=RECORD_BATCH_ROWS):
+    """
+    Turns a Spanner result stream into (schema, generator of typed RecordBatches).
+    Rows are gathered column-wise, batch_rows at a time.
+    """
+    rows = iter(results)
+    first = next(rows, None)  # result metadata (fields) arrives with the first response
+    schema = arrow_schema(results.fields)
+
+    def batches():
+        if first is None:
+            return
+        columns = [[value] for value in first]
+        count = 1
+        for row in rows:
+            if count == batch_rows:
+                yield _to_record_batch(columns, schema)
+                columns = [[] for _ in schema]
+                count = 0
+            for column, value in zip(columns, row):
+                column.append(value)
+            count += 1
+        if count:
+            yield _to_record_batch(columns, schema)
+
+    return schema, batches()
+
+def write_parquet_shard(results, raw):
+    """shard_writer for export_table_partitioned: zstd-compressed Parquet (smallest on GCS)."""
+    schema, batches = iter_record_batches(results)
+    row_count = 0
+    with pq.ParquetWriter(raw, schema, compression="zstd") as writer:
+        for batch in batches:
+            writer.write_batch(batch)
+            row_count += batch.num_rows
+    return row_count
+
+def write_arrow_shard(results, raw):
+    """shard_writer for export_table_partitioned: uncompressed Arrow IPC file (memory-mappable, zero-copy reads)."""
+    schema, batches = iter_record_batches(results)
+    row_count = 0
+    with pa.ipc.new_file(raw, schema) as writer:
+        for batch in batches:
+            writer.write_batch(batch)
+            row_count += batch.num_rows
+    return row_count
+
+SHARD_WRITERS = {
+    "parquet": (write_parquet_shard, "parquet"),
+    "arrow": (write_arrow_shard, "arrow"),
+}
+
+def export_table_columnar(database, bucket, table_name, prefix, fmt="parquet", max_workers=EXPORT_WORKERS, sql=None):
+    """Partitioned export that writes typed Parquet or Arrow shards instead of CSV."""
+    shard_writer, extension = SHARD_WRITERS[fmt]
+    return export_table_partitioned(database, bucket, table_name, prefix, max_workers, sql, shard_writer, extension)
+
+def iter_columnar_batches(path):
+    """
+    Reads a shard as RecordBatches. Arrow IPC files are memory-mapped, so batches
+    are zero-copy views of the file; Parquet is read through a memory map too.
+    """
+    if path.endswith(".arrow"):
+        with pa.memory_map(path, "r") as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                yield reader.get_batch(i)
+    else:
+        parquet_file = pq.ParquetFile(path, memory_map=True)
+        yield from parquet_file.iter_batches(batch_size=RECORD_BATCH_ROWS)
+
+def record_batch_rows(batch):
+    """Typed Python rows for a mutation: converted column by column, not parsed from text."""
+    columns = [column.to_pylist() for column in batch.columns]
+    return list(zip(*columns))
+
+def iter_spanner_batches(record_batches, column_count, max_mutations=MAX_MUTATIONS_PER_COMMIT,
+                         max_bytes=MAX_BATCH_BYTES, first_row=0):
+    """
+    Slices RecordBatches into commit-sized (start_row, rows) batches.
+    Sizing uses the batch's buffer size instead of measuring every value.
+    Rows before first_row (already committed) are skipped.
+    """
+    offset = 0
+    for record_batch in record_batches:
+        if offset + record_batch.num_rows <= first_row:
+            offset += record_batch.num_rows
+            continue
+        if offset < first_row:
+            record_batch = record_batch.slice(first_row - offset)
+            offset = first_row
+        if record_batch.num_rows == 0:
+            continue
+
+        avg_row_bytes = max(1, record_batch.nbytes // record_batch.num_rows)
+        rows_per_commit = max(1, min(max_mutations // max(1, column_count), max_bytes // avg_row_bytes))
+        for start in range(0, record_batch.num_rows, rows_per_commit):
+            part = record_batch.slice(start, rows_per_commit)
+            yield offset, record_batch_rows(part)
+            offset += part.num_rows
+
+def load_columnar_to_spanner(database, table_name, path, checkpoint_path=None, max_mutations=MAX_MUTATIONS_PER_COMMIT,
+                             max_bytes=MAX_BATCH_BYTES, max_workers=MAX_WORKERS):
+    """
+    Loads a Parquet/Arrow shard into Spanner with the same parallel, checkpointed
+    commit engine as the CSV loader, keeping the column types from the file.
+    """
+    checkpoint = LoadCheckpoint(checkpoint_path, os.path.abspath(path), table_name) if checkpoint_path else None
+    resume_from = checkpoint.rows_committed if checkpoint else 0
+    upsert = bool(checkpoint and checkpoint.resuming)  # batches past the prefix may already be written
+    record_batches = iter_columnar_batches(path)
+    first = next(record_batches, None)
+    if first is None:
+        if checkpoint:
+            checkpoint.clear()
+        return {"rows": 0, "batches": 0, "seconds": 0.0, "rows_per_sec": 0.0}
+    columns = first.schema.names
+
+    if upsert:
+        print(f"Resuming {path} after {resume_from} committed rows")
+    if checkpoint:
+        checkpoint.start()
+
+    def all_batches():
+        yield first
+        yield from record_batches
+
+    batches = iter_spanner_batches(all_batches(), len(columns), max_mutations, max_bytes, resume_from)
+    stats = commit_batches(database, table_name, columns, batches, max_workers, checkpoint, upsert=upsert)
+    if checkpoint:
+        checkpoint.clear()
+    return stats
+
+def import_columnar_from_gcs(database, bucket, prefix, table_name, local_dir="/tmp"):
+    """
+    Downloads the shards listed in {prefix}/manifest.json one at a time and loads
+    them. Work files live in a directory of local_dir specific to the table, the
+    prefix and the manifest's content, so markers of another table, prefix or an
+    earlier export of the same prefix are never picked up. Finished shards leave
+    a .done marker there so a re-run skips them.
+    """
+    with bucket.blob(f"{prefix}/manifest.json").open("rb") as f:
+        manifest_bytes = f.read()
+    manifest = json.loads(manifest_bytes)
+    import_id = hashlib.sha1(f"{table_name}\0{prefix}\0".encode("utf-8") + manifest_bytes).hexdigest()[:16]
+    work_dir = os.path.join(local_dir, f"spanner_import_{import_id}")
+    os.makedirs(work_dir, exist_ok=True)
+
+    total_rows = 0
+    for shard in manifest["shards"]:
+        local_path = os.path.join(work_dir, shard["blob"].replace("/", "_"))
+        if os.path.exists(local_path + ".done"):
+            continue
+        bucket.blob(shard["blob"]).download_to_filename(local_path)
+        stats = load_columnar_to_spanner(database, table_name, local_path, checkpoint_path=local_path + ".checkpoint")
+        total_rows += stats["rows"]
+        os.remove(local_path)
+        open(local_path + ".done", "w").close()
+    print(f"Imported {total_rows} rows into {table_name} from {len(manifest['shards'])} shards")
+    return total_rows
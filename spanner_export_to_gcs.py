@@ -1,13 +1,19 @@
 import csv
 from google.cloud import spanner
 from google.cloud import storage
+from spanner_loader import load_csv_to_spanner
+from spanner_partitioned_export import export_table_partitioned
+from spanner_columnar import export_table_columnar, import_columnar_from_gcs
 
 PROJECT_ID = 'your-project-id'
 INSTANCE_ID = 'your-instance-id'
-DATABASE_ID = 'source-db-id'
+SOURCE_DATABASE_ID = 'source-db-id'
+DEST_DATABASE_ID = 'destination-db-id'
 TABLE_NAME = 'cc_work_all_tables'
 BUCKET_NAME = 'your-gcs-bucket-name'
 GCS_BLOB_NAME = 'spanner_exports/cc_work_all_tables.csv'
+GCS_EXPORT_PREFIX = 'spanner_exports/cc_work_all_tables'
+EXPORT_FORMAT = 'csv'  # 'csv', 'parquet' (smallest) or 'arrow' (memory-mappable)
 LOCAL_CSV_FILE = '/tmp/cc_work_all_tables.csv'
 
 def connect_spanner(project_id, instance_id, database_id):
@@ -24,7 +30,7 @@ def upload_to_gcs(bucket_name, source_file, destination_blob):
     print(f"Uploaded to gs://{bucket_name}/{destination_blob}")
 
 def export_spanner_to_csv():
-    db = connect_spanner(PROJECT_ID, INSTANCE_ID, DATABASE_ID)
+    db = connect_spanner(PROJECT_ID, INSTANCE_ID, SOURCE_DATABASE_ID)
 
     with open(LOCAL_CSV_FILE, 'w', newline='') as csvfile:
         with db.snapshot() as snapshot:
@@ -39,38 +45,17 @@ def export_spanner_to_csv():
     print(f"Exported data to local file: {LOCAL_CSV_FILE}")
     upload_to_gcs(BUCKET_NAME, LOCAL_CSV_FILE, GCS_BLOB_NAME)
 
-if __name__ == "__main__":
-    export_spanner_to_csv()
-
-
-
-
-
-
-
-
-
-
-
-import csv
-import os
-from google.cloud import storage
-from google.cloud import spanner
-
-PROJECT_ID = 'your-project-id'
-INSTANCE_ID = 'your-instance-id'
-DATABASE_ID = 'destination-db-id'
-TABLE_NAME = 'cc_work_all_tables'
-BUCKET_NAME = 'your-gcs-bucket-name'
-GCS_BLOB_NAME = 'spanner_exports/cc_work_all_tables.csv'
-LOCAL_CSV_FILE = '/tmp/cc_work_all_tables.csv'
-CHUNK_SIZE = 500
-
-def connect_spanner(project_id, instance_id, database_id):
-    client = spanner.Client(project=project_id)
-    instance = client.instance(instance_id)
-    database = instance.database(database_id)
-    return database
+def export_spanner_to_gcs_partitioned(fmt=EXPORT_FORMAT):
+    """
+    Partitioned export: reads query partitions in parallel and streams each one
+    into its own shard under GCS_EXPORT_PREFIX, plus a manifest.json.
+    fmt='parquet'/'arrow' keeps the Spanner column types instead of writing CSV.
+    """
+    db = connect_spanner(PROJECT_ID, INSTANCE_ID, SOURCE_DATABASE_ID)
+    bucket = storage.Client().bucket(BUCKET_NAME)
+    if fmt == 'csv':
+        return export_table_partitioned(db, bucket, TABLE_NAME, GCS_EXPORT_PREFIX)
+    return export_table_columnar(db, bucket, TABLE_NAME, GCS_EXPORT_PREFIX, fmt=fmt)
 
 def download_from_gcs(bucket_name, blob_name, destination_file):
     storage_client = storage.Client()
@@ -79,31 +64,20 @@ def download_from_gcs(bucket_name, blob_name, destination_file):
     blob.download_to_filename(destination_file)
     print(f"Downloaded file from gs://{bucket_name}/{blob_name} to {destination_file}")
 
-def chunk_data(data, chunk_size):
-    for i in range(0, len(data), chunk_size):
-        yield data[i:i + chunk_size]
-
-def insert_into_spanner(database, table_name, columns, rows):
-    with database.batch() as batch:
-        batch.insert(
-            table=table_name,
-            columns=columns,
-            values=rows
-        )
-    print(f"Inserted {len(rows)} rows")
-
 def import_csv_to_spanner():
-    db = connect_spanner(PROJECT_ID, INSTANCE_ID, DATABASE_ID)
+    db = connect_spanner(PROJECT_ID, INSTANCE_ID, DEST_DATABASE_ID)
     download_from_gcs(BUCKET_NAME, GCS_BLOB_NAME, LOCAL_CSV_FILE)
 
-    with open(LOCAL_CSV_FILE, 'r') as file:
-        reader = csv.reader(file)
-        rows = list(reader)
-        headers = rows[0]
-        data_rows = rows[1:]
+    # Streams the CSV and commits byte/mutation-sized batches in parallel;
+    # an interrupted import resumes from the checkpoint on the next run.
+    load_csv_to_spanner(db, TABLE_NAME, LOCAL_CSV_FILE, checkpoint_path=LOCAL_CSV_FILE + '.checkpoint')
 
-    for chunk in chunk_data(data_rows, CHUNK_SIZE):
-        insert_into_spanner(db, TABLE_NAME, headers, chunk)
+def import_columnar_to_spanner():
+    """Imports the typed Parquet/Arrow shards written by export_spanner_to_gcs_partitioned."""
+    db = connect_spanner(PROJECT_ID, INSTANCE_ID, DEST_DATABASE_ID)
+    bucket = storage.Client().bucket(BUCKET_NAME)
+    import_columnar_from_gcs(db, bucket, GCS_EXPORT_PREFIX, TABLE_NAME)
 
 if __name__ == "__main__":
+    export_spanner_to_csv()
     import_csv_to_spanner()
@@ -0,0 +1,224 @@
+import csv
+import itertools
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+MAX_MUTATIONS_PER_COMMIT = 20000    # Spanner counts cells (rows x columns); the hard limit is 80,000
+MAX_BATCH_BYTES = 4 * 1024 * 1024   # payload per commit, far below the 100 MB request limit
+MAX_WORKERS = 4                     # commits in flight at the same time
+
+def _value_bytes(value):
+    if value is None:
+        return 0
+    if isinstance(value, bytes):
+        return len(value)
+    return len(str(value).encode('utf-8'))
+
+def iter_mutation_batches(rows, column_count, max_mutations=MAX_MUTATIONS_PER_COMMIT, max_bytes=MAX_BATCH_BYTES, first_row=0):
+    """
+    Groups a stream of rows into commit-sized batches.
+    A batch is closed when adding the next row would exceed either the mutation
+    (cell) count or the payload bytes. Yields (start_row, rows).
+    """
+    batch = []
+    batch_bytes = 0
+    start_row = first_row
+    rows_per_batch = max(1, max_mutations // max(1, column_count))
+
+    for row in rows:
+        row_bytes = sum(_value_bytes(v) for v in row)
+        if batch and (len(batch) >= rows_per_batch or batch_bytes + row_bytes > max_bytes):
+            yield start_row, batch
+            start_row += len(batch)
+            batch = []
+            batch_bytes = 0
+        batch.append(row)
+        batch_bytes += row_bytes
+
+    if batch:
+        yield start_row, batch
+
+class LoadCheckpoint:
+    """
+    Tracks committed row ranges and persists the contiguous committed prefix,
+    so an interrupted load can resume after the last row known to be written.
+    Batches finish out of order, so only the prefix below the lowest
+    unfinished batch is recorded. resuming is True when a checkpoint file of an
+    earlier run exists, even with an empty prefix: batches past the prefix may
+    have been written, so the rest of the load must upsert.
+    """
+
+    def __init__(self, path, source, table_name):
+        self.path = path
+        self.source = source
+        self.table_name = table_name
+        self.rows_committed = 0
+        self.resuming = False
+        self._finished = {}  # start_row -> end_row, for batches past the prefix
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, 'r') as f:
+                state = json.load(f)
+            if state.get("source") == source and state.get("table") == table_name:
+                self.rows_committed = state["rows_committed"]
+                self.resuming = True
+
+    def start(self):
+        """Writes the checkpoint file before the first commit, so a failed run is always seen as one."""
+        if self.path:
+            with self._lock:
+                self._save()
+
+    def mark_done(self, start_row, row_count):
+        with self._lock:
+            self._finished[start_row] = start_row + row_count
+            advanced = False
+            while self.rows_committed in self._finished:
+                self.rows_committed = self._finished.pop(self.rows_committed)
+                advanced = True
+            if advanced and self.path:
+                self._save()
+
+    def _save(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({"source": self.source, "table": self.table_name, "rows_committed": self.rows_committed}, f)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+def commit_batch(database, table_name, columns, rows, upsert=False):
+    with database.batch() as batch:
+        if upsert:
+            batch.insert_or_update(table=table_name, columns=columns, values=rows)
+        else:
+            batch.insert(table=table_name, columns=columns, values=rows)
+
+def commit_batches(database, table_name, columns, batches, max_workers=MAX_WORKERS, checkpoint=None, upsert=False):
+    """
+    Commits (start_row, rows) batches, up to max_workers at once.
+    Batches are pulled lazily, so at most ~2 x max_workers are held in memory.
+    Returns load stats including rows/sec.
+    """
+    total_rows = 0
+    total_batches = 0
+    started = time.perf_counter()
+
+    def finish(futures):
+        nonlocal total_rows, total_batches
+        for future in futures:
+            start_row, row_count = future.result()  # re-raises a failed commit
+            if checkpoint:
+                checkpoint.mark_done(start_row, row_count)
+            total_rows += row_count
+            total_batches += 1
+
+    def run(start_row, batch):
+        commit_batch(database, table_name, columns, batch, upsert)
+        return start_row, len(batch)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        in_flight = set()
+        for start_row, batch in batches:
+            if len(in_flight) >= max_workers * 2:  # bound memory held by queued batches
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                finish(done)
+            in_flight.add(pool.submit(run, start_row, batch))
+        finish(wait(in_flight).done)
+
+    elapsed = time.perf_counter() - started
+    stats = {
+        "rows": total_rows,
+        "batches": total_batches,
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round(total_rows / elapsed, 1) if elapsed > 0 else float(total_rows)
+    }
+    print(f"Inserted {total_rows} rows in {total_batches} batches ({stats['rows_per_sec']} rows/sec)")
+    return stats
+
+def load_rows_to_spanner(database, table_name, columns, rows, max_mutations=MAX_MUTATIONS_PER_COMMIT,
+                         max_bytes=MAX_BATCH_BYTES, max_workers=MAX_WORKERS, checkpoint=None, upsert=False):
+    """
+    Streams rows into Spanner, committing up to max_workers batches at once.
+    rows is any iterable (it is consumed lazily, never materialized).
+    Returns load stats including rows/sec.
+    """
+    first_row = checkpoint.rows_committed if checkpoint else 0
+    batches = iter_mutation_batches(rows, len(columns), max_mutations, max_bytes, first_row)
+    return commit_batches(database, table_name, columns, batches, max_workers, checkpoint, upsert)
+
+def load_csv_to_spanner(database, table_name, csv_path, checkpoint_path=None, **kwargs):
+    """
+    Streams a CSV (header row = column names) into Spanner.
+    With checkpoint_path, progress is saved as batches commit; re-running after
+    an interruption skips the committed rows and upserts the rest, since
+    batches after the checkpoint may already have been written.
+    """
+    checkpoint = LoadCheckpoint(checkpoint_path, os.path.abspath(csv_path), table_name) if checkpoint_path else None
+    resume_from = checkpoint.rows_committed if checkpoint else 0
+    if checkpoint:
+        if checkpoint.resuming:
+            print(f"Resuming {csv_path} after {resume_from} committed rows")
+            kwargs["upsert"] = True
+        checkpoint.start()
+
+    with open(csv_path, 'r', newline='') as file:
+        reader = csv.reader(file)
+        headers = next(reader)
+        rows = itertools.islice(reader, resume_from, None)
+        stats = load_rows_to_spanner(database, table_name, headers, rows, checkpoint=checkpoint, **kwargs)
+
+    if checkpoint:
+        checkpoint.clear()
+    return stats
+
+class FakeSpannerDatabase:
+    """
+    Local stand-in for a google.cloud.spanner Database, for tests and dry runs.
+    Supports database.batch() with insert / insert_or_update and records the rows.
+    """
+
+    def __init__(self, fail_on_commit=None):
+        self.tables = {}
+        self.commits = 0
+        self.fail_on_commit = fail_on_commit  # raise on the Nth commit, to simulate interruptions
+        self._lock = threading.Lock()
+
+    def batch(self):
+        return _FakeBatch(self)
+
+class _FakeBatch:
+    def __init__(self, database):
+        self.database = database
+        self.mutations = []
+
+    def insert(self, table, columns, values):
+        self.mutations.append((table, columns, list(values), False))
+
+    def insert_or_update(self, table, columns, values):
+        self.mutations.append((table, columns, list(values), True))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type:
+            return False
+        db = self.database
+        with db._lock:
+            db.commits += 1
+            if db.fail_on_commit is not None and db.commits == db.fail_on_commit:
+                raise RuntimeError(f"Simulated failure on commit {db.commits}")
+            for table, columns, values, upsert in self.mutations:
+                rows = db.tables.setdefault(table, {})
+                for row in values:
+                    key = row[0]  # first column acts as the primary key
+                    if key in rows and not upsert:
+                        raise ValueError(f"Row {key!r} already exists in {table}")
+                    rows[key] = dict(zip(columns, row))
+        return False
@@ -0,0 +1,232 @@
+import re
+
+# Check if table name is parameterized
+def is_parameterized(table_name):
+    return any(sym in table_name for sym in ['<', '>', '#', '{', '}'])
+
+# Keyword sequences after which the next table reference is a write target
+OUTPUT_SEQUENCES = [
+    ("INSERT", "INTO"),
+    ("INSERT", "OVERWRITE", "TABLE"),
+    ("MERGE", "INTO"),
+    ("REPLACE", "TABLE"),
+    ("DELETE", "FROM"),
+    ("UPDATE",),
+    ("TRUNCATE", "TABLE"),
+    ("DROP", "TABLE"),
+    ("DROP", "VIEW"),
+]
+CREATE_MODIFIERS = {"OR", "REPLACE", "TEMP", "TEMPORARY", "EXTERNAL", "SNAPSHOT", "MATERIALIZED"}
+CREATE_OBJECTS = {"TABLE", "VIEW"}
+
+# Functions whose argument lists use FROM without it naming a table
+FROM_FUNCTIONS = {"EXTRACT", "TRIM", "SUBSTRING", "POSITION", "OVERLAY"}
+
+# Words that end a FROM list (anything else after a table is an alias)
+FROM_LIST_END = {
+    "WHERE", "GROUP", "ORDER", "HAVING", "LIMIT", "UNION", "INTERSECT", "EXCEPT", "JOIN", "INNER",
+    "LEFT", "RIGHT", "FULL", "CROSS", "OUTER", "ON", "USING", "WINDOW", "QUALIFY", "SELECT", "WITH",
+    "SET", "WHEN", "THEN", "PIVOT", "UNPIVOT", "TABLESAMPLE", "FOR", "VALUES", "AND", "OR", "MATCHED",
+    "OFFSET", "FETCH", "RETURNING", "CLUSTER", "PARTITION", "OPTIONS", "LATERAL",
+}
+
+# Every word the scanner reacts to; other identifiers only break keyword sequences
+KEYWORDS = (
+    {word for sequence in OUTPUT_SEQUENCES for word in sequence}
+    | CREATE_MODIFIERS | CREATE_OBJECTS | FROM_FUNCTIONS | FROM_LIST_END | {"CREATE"}
+)
+
+# Comments and string literals are matched whole, so their contents are never
+# mistaken for SQL; everything that is not a token (numbers, operators, the
+# dotted tail of qualified names) is skipped by the regex search itself. No
+# alternative can backtrack across the text, so the scan is linear on any input.
+TOKEN_PATTERN = re.compile(r"""
+    (?P<comment>--[^\n]*|/\*[\s\S]*?(?:\*/|\Z)|(?m:^)[ \t]*\#[^\n]*)
+  | (?P<string>'''[\s\S]*?(?:'''|\Z)|\"\"\"[\s\S]*?(?:\"\"\"|\Z)|'(?:[^'\\\n]|\\.)*'|"(?:[^"\\\n]|\\.)*")
+  | (?P<quoted>`[^`]*`)
+  | (?P<word>(?<![\w.$])[A-Za-z_]\w*)
+  | (?P<punct>[(),;])
+""", re.VERBOSE)
+
+# A (possibly qualified, quoted or templated) table reference, read directly
+# from the source right after a FROM/JOIN/INTO/... keyword.
+TABLE_PART_PATTERN = re.compile(r"""
+    `(?P<backtick>[^`]*)`
+  | "(?P<dquote>[^"\n]*)"
+  | '(?P<squote>[^'\n]*)'
+  | (?P<jinja>\{\{[^}]*\}\})
+  | (?P<plain>[A-Za-z0-9_\-<>{}\[\]\#$@:]+)
+""", re.VERBOSE)
+GAP_PATTERN = re.compile(r'(?:\s+|--[^\n]*|/\*[\s\S]*?(?:\*/|\Z))*')
+IF_EXISTS_PATTERN = re.compile(r'IF\s+(?:NOT\s+)?EXISTS\b', re.IGNORECASE)
+
+# WITH [RECURSIVE] name [(columns)] AS (   and, after a CTE body,   , name [(columns)] AS (
+CTE_PATTERN = re.compile(
+    r'\s*(?:RECURSIVE\s+)?[`"]?(?P<name>[A-Za-z_][A-Za-z0-9_]*)[`"]?\s*(?:\([^()]*\)\s*)?AS\s*\(', re.IGNORECASE
+)
+NEXT_CTE_PATTERN = re.compile(
+    r'\s*,\s*[`"]?(?P<name>[A-Za-z_][A-Za-z0-9_]*)[`"]?\s*(?:\([^()]*\)\s*)?AS\s*\(', re.IGNORECASE
+)
+
+def _read_table_ref(sql_text, pos):
+    """Reads a table reference at pos; returns (name, end) or (None, pos)."""
+    parts = []
+    end = pos
+    while True:
+        match = TABLE_PART_PATTERN.match(sql_text, end)
+        if not match:
+            break
+        parts.append(match.group(match.lastgroup))
+        end = match.end()
+        if end < len(sql_text) and sql_text[end] == '.':
+            end += 1
+            continue
+        break
+    if not parts:
+        return None, pos
+    return '.'.join(parts).strip('.'), end
+
+def _skip_gap(sql_text, pos):
+    """Skips whitespace and comments."""
+    return GAP_PATTERN.match(sql_text, pos).end()
+
+def _is_output_context(words):
+    """True when the recent keywords end in a write-target sequence."""
+    for sequence in OUTPUT_SEQUENCES:
+        if tuple(words[-len(sequence):]) == sequence:
+            return True
+    # CREATE [OR REPLACE] [TEMP] TABLE|VIEW
+    index = len(words) - 1
+    if index >= 1 and words[index] in CREATE_OBJECTS:
+        i = index - 1
+        while i >= 0 and words[i] in CREATE_MODIFIERS:
+            i -= 1
+        return i >= 0 and words[i] == 'CREATE'
+    return False
+
+def _tag(table, direction):
+    return f'{direction.lower()}-unresolved' if is_parameterized(table) else direction
+
+def _read_input_ref(sql_text, pos):
+    """Table reference after FROM/JOIN/USING; (None, pos) for subqueries, UNNEST(...) etc."""
+    table, end = _read_table_ref(sql_text, _skip_gap(sql_text, pos))
+    if table is None or table.upper() in KEYWORDS:
+        return None, pos
+    after = _skip_gap(sql_text, end)
+    if sql_text[after:after + 1] == '(':
+        return None, pos
+    return table, end
+
+def scan_sql_lineage(sql_text):
+    """
+    Single linear pass over a SQL script.
+    Yields (table, tag) in the order tables are referenced, with the same
+    Input / Output / input-unresolved / output-unresolved tags as the regex
+    extractor. CTE names are reported as Output (as before) and are never
+    reported as inputs within the statement that defines them.
+    """
+    words = []            # recent keywords, None marking any other token in between
+    parens = []           # stack: True when the paren belongs to EXTRACT(... FROM ...) etc.
+    cte_names = set()     # CTEs visible in the current statement
+    cte_depths = []       # paren depth at which each open CTE body started
+    from_list = False     # inside FROM a [alias], b ... after a table reference
+    skip_to = 0           # end of text already consumed by a table reference or CTE header
+
+    for match in TOKEN_PATTERN.finditer(sql_text):
+        if match.start() < skip_to:
+            continue
+        kind = match.lastgroup
+
+        if kind == 'word':
+            word = match.group(kind).upper()
+            if word not in KEYWORDS:
+                if words and words[-1] is not None:
+                    words.append(None)
+                continue
+        elif kind == 'punct':
+            char = match.group(kind)
+            if char == '(':
+                parens.append(bool(words) and words[-1] in FROM_FUNCTIONS)
+                from_list = False
+            elif char == ')':
+                from_list = False
+                if cte_depths and cte_depths[-1] == len(parens):
+                    next_cte = NEXT_CTE_PATTERN.match(sql_text, match.end())
+                    if next_cte:
+                        # the next body reuses this paren level
+                        skip_to = next_cte.end()
+                        cte_names.add(next_cte.group('name').upper())
+                        yield next_cte.group('name'), 'Output'
+                        words = []
+                        continue
+                    cte_depths.pop()
+                if parens:
+                    parens.pop()
+            elif char == ',' and from_list:
+                table, skip_to = _read_input_ref(sql_text, match.end())
+                if table and table.upper() not in cte_names:
+                    yield table, _tag(table, 'Input')
+                from_list = table is not None
+            elif char == ';':
+                parens = []
+                cte_names = set()
+                cte_depths = []
+                from_list = False
+            words.append(None)
+            continue
+        else:
+            if kind != 'comment' and words and words[-1] is not None:
+                words.append(None)
+            continue
+
+        if from_list and word in FROM_LIST_END:
+            from_list = False
+
+        if word == 'WITH':
+            cte = CTE_PATTERN.match(sql_text, match.end())
+            if cte:
+                # the body's opening paren is consumed here, so it is pushed by hand
+                skip_to = cte.end()
+                cte_names.add(cte.group('name').upper())
+                yield cte.group('name'), 'Output'
+                parens.append(False)
+                cte_depths.append(len(parens))
+                words = []
+                continue
+
+        words.append(word)
+        if len(words) > 16:
+            del words[:-8]
+
+        if word == 'FROM' and parens and parens[-1]:
+            continue  # EXTRACT(DAY FROM col)
+        if word in ('FROM', 'JOIN', 'USING') and words[-2:-1] != ['DELETE']:
+            table, skip_to = _read_input_ref(sql_text, match.end())
+            if table:
+                from_list = True
+                if table.upper() not in cte_names:
+                    yield table, _tag(table, 'Input')
+            continue
+
+        if _is_output_context(words):
+            words = []
+            start = _skip_gap(sql_text, match.end())
+            if_exists = IF_EXISTS_PATTERN.match(sql_text, start)
+            if if_exists:
+                start = _skip_gap(sql_text, if_exists.end())
+            table, end = _read_table_ref(sql_text, start)
+            # e.g. MERGE ... THEN UPDATE SET has no target of its own
+            if table and table.upper() not in KEYWORDS:
+                skip_to = end
+                yield table, _tag(table, 'Output')
+
+def extract_tables(sql_text):
+    """Drop-in for extracttablename.extract_tables_from_sql: returns (input_tables, output_tables)."""
+    input_tables = []
+    output_tables = []
+    for table, tag in scan_sql_lineage(sql_text):
+        if tag.lower().startswith('input'):
+            input_tables.append((table, tag))
+        else:
+            output_tables.append((table, tag))
+    return input_tables, output_tables
@@ -0,0 +1,152 @@
+import ast
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+import ast_cache
+from constant_propagation import ModuleScopes, render_fstring, shared_values, substitute_placeholders
+from getcombined import iter_git_repo_files
+from sql_lineage import extract_tables
+
+LINEAGE_FILE_PATTERN = r'\.(sql|py)$'
+COLUMNS = ["FilePath", "FileType", "FileName", "Table Name", "Type"]
+SQL_HINT = re.compile(r'\b(?:FROM|JOIN|INTO|TABLE|MERGE|UPDATE)\b', re.IGNORECASE)
+
+def sql_fragments_from_python(code, values=None):
+    """
+    SQL embedded in a Python file: every string literal that looks like SQL.
+    f-string fields are filled from values (the module's known constants) where
+    possible and otherwise kept as {expr}, so the tables they build are tagged
+    unresolved. Falls back to the whole file if it does not parse.
+    """
+    try:
+        tree = ast_cache.parse(code)
+    except (SyntaxError, ValueError):
+        return [code]
+
+    fragments = []
+    in_fstring = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.JoinedStr):
+            in_fstring.update(id(value) for value in node.values)
+            text = render_fstring(node, values or {}, lambda field: "{" + ast.unparse(field.value) + "}")
+        elif isinstance(node, ast.Constant) and isinstance(node.value, str) and id(node) not in in_fstring:
+            text = node.value
+        else:
+            continue
+        if SQL_HINT.search(text):
+            fragments.append(text)
+    return fragments
+
+def extract_file_tables(full_path, content, values=None):
+    """
+    Lineage rows [FilePath, FileType, FileName, Table Name, Type] for one .sql or .py file.
+    values ({name: value}, see file_values) fills f-string fields and SQL
+    placeholders such as <VAR>, {VAR} or {{ params.VAR }} before extraction.
+    """
+    file_name = os.path.basename(full_path)
+    file_type = os.path.splitext(file_name)[1].lower()
+    if file_type == '.py':
+        # statements from separate literals never share CTE scope
+        sql_text = ";\n".join(sql_fragments_from_python(content, values))
+    else:
+        sql_text = content
+    sql_text = substitute_placeholders(sql_text, values)
+
+    input_tables, output_tables = extract_tables(sql_text)
+    rows = [[full_path, file_type, file_name, table, tag] for table, tag in input_tables + output_tables]
+    if not rows:
+        rows.append([full_path, file_type, file_name, "N/A", "No Matches"])
+    return rows
+
+def _extract_file_item(item):
+    return extract_file_tables(*item)
+
+def file_values(all_files_objects, dag_files=None):
+    """
+    {path: known constants} used to resolve parameterized table names.
+    A .py file gets its module scope (imports of repo modules followed, see
+    constant_propagation.ModuleScopes). A .sql file gets the values shared by
+    every DAG that uses it, given dag_files {dag_path: repo paths it uses}.
+    """
+    sources = {fobj['full_path']: fobj['content'] for fobj in all_files_objects
+               if fobj['full_path'].lower().endswith('.py')}
+    scopes = ModuleScopes(sources)
+    values = {path: scopes.module_scope(path) for path in sources}
+    if dag_files:
+        dags_by_sql = {}
+        for dag_path, paths in dag_files.items():
+            for path in paths:
+                if path.lower().endswith('.sql') and dag_path in values:
+                    dags_by_sql.setdefault(path, []).append(values[dag_path])
+        for path, dag_scopes in dags_by_sql.items():
+            values[path] = shared_values(dag_scopes)
+    return values
+
+def extract_repo_lineage(all_files_objects, max_workers=None, values_by_path=None):
+    """
+    Table lineage for every .sql/.py file of a fetched repo (the objects returned
+    by getcombined.iter_git_repo_files / process_git_repo), extracted on a
+    process pool. Returns one deduplicated DataFrame with categorical columns.
+    values_by_path (see file_values) resolves parameterized names; by default
+    the .py files are resolved against the constants of the given files.
+    """
+    all_files_objects = list(all_files_objects)
+    if values_by_path is None:
+        values_by_path = file_values(all_files_objects)
+    name_pattern = re.compile(LINEAGE_FILE_PATTERN, re.IGNORECASE)
+    items = [(fobj['full_path'], fobj['content'], values_by_path.get(fobj['full_path'])) for fobj in all_files_objects
+             if name_pattern.search(fobj['full_path'])]
+    max_workers = max_workers or os.cpu_count() or 1
+
+    columns = {name: [] for name in COLUMNS}
+    if max_workers == 1 or len(items) < 2:
+        results = map(_extract_file_item, items)
+        pool = None
+    else:
+        pool = ProcessPoolExecutor(max_workers=max_workers)
+        results = pool.map(_extract_file_item, items, chunksize=max(1, len(items) // (max_workers * 4)))
+    try:
+        for rows in results:
+            for row in rows:
+                for name, value in zip(COLUMNS, row):
+                    columns[name].append(value)
+    finally:
+        if pool:
+            pool.shutdown()
+
+    df = pd.DataFrame(columns).astype("category")
+    return df.drop_duplicates(ignore_index=True)
+
+def extract_repo_lineage_from_git(provider, base_url, org_name, repo_name, token, branch='main', cache=None, max_workers=None):
+    """Fetches a repo archive (see getcombined) and extracts lineage for all its .sql/.py files."""
+    files = iter_git_repo_files(provider, base_url, org_name, repo_name, token, LINEAGE_FILE_PATTERN, 'filename', branch, cache)
+    return extract_repo_lineage(files, max_workers)
+
+class TableLineageIndex:
+    """
+    Reverse index over a lineage frame: table -> row positions, built once with
+    a groupby on the categorical codes. Table lookups are case-insensitive.
+    """
+
+    def __init__(self, df):
+        self.df = df
+        tables = df["Table Name"].map(str.upper)  # maps the categories, not every row
+        self._by_table = df.groupby(tables, observed=True, sort=False).indices
+        self._by_file = df.groupby("FilePath", observed=True, sort=False).indices
+
+    def files_for_table(self, table_name, table_type=None):
+        """Files that touch table_name; table_type narrows it to e.g. 'Output' (case-insensitive prefix)."""
+        positions = self._by_table.get(table_name.upper())
+        if positions is None:
+            return []
+        rows = self.df.iloc[positions]
+        if table_type:
+            rows = rows[rows["Type"].astype(str).str.lower().str.startswith(table_type.lower())]
+        return list(rows["FilePath"].astype(str).unique())
+
+    def tables_for_file(self, full_path):
+        positions = self._by_file.get(full_path)
+        if positions is None:
+            return self.df.iloc[0:0]
+        return self.df.iloc[positions][["Table Name", "Type"]]
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The repo's modules live at its root. Append rather than prepend it: email.py
+# there would otherwise shadow the standard library package.
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
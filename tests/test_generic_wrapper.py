@@ -0,0 +1,11 @@
+from generic_wrapper import JobConfigTable
+
+def test_config_table_with_ragged_row(tmp_path):
+    path = tmp_path / "job_config.csv"
+    path.write_text("JOB_NAME,SQL\njob_a,select a, b from t\njob_b,select c from u\n", encoding="utf-8")
+
+    table = JobConfigTable.from_csv(str(path))
+
+    assert set(table.columns) == {"job_name", "sql"}
+    assert [row["SQL"] for row in table.match({"job_name": "job_a"})] == ["select a"]
+    assert [row["SQL"] for row in table.match({"job_name": "job_b"})] == ["select c from u"]
@@ -0,0 +1,49 @@
+from types import SimpleNamespace
+
+import pytest
+
+from spanner_columnar import export_table_columnar, import_columnar_from_gcs, load_columnar_to_spanner
+from spanner_loader import FakeSpannerDatabase
+from spanner_partitioned_export import FakeBatchDatabase, FakeField, LocalBucket
+
+COLUMNS = [("id", "INT64"), ("name", "STRING"), ("score", "FLOAT64")]
+
+def _source(rows, partitions=3):
+    database = FakeBatchDatabase([name for name, _ in COLUMNS], rows, partitions)
+    database.fields = [FakeField(name, SimpleNamespace(code=code)) for name, code in COLUMNS]
+    return database
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+def test_local_round_trip(tmp_path, fmt):
+    rows = [(i, f"name-{i}", i / 2) for i in range(100)]
+    bucket = LocalBucket(str(tmp_path / "bucket"))
+    export_table_columnar(_source(rows), bucket, "Scores", "exports/scores", fmt=fmt)
+
+    destination = FakeSpannerDatabase()
+    total = import_columnar_from_gcs(destination, bucket, "exports/scores", "Scores", local_dir=str(tmp_path / "work"))
+
+    assert total == len(rows)
+    loaded = destination.tables["Scores"].values()
+    assert sorted(tuple(row[name] for name, _ in COLUMNS) for row in loaded) == rows
+
+def test_rerun_skips_finished_shards(tmp_path):
+    rows = [(i, f"name-{i}", float(i)) for i in range(10)]
+    bucket = LocalBucket(str(tmp_path / "bucket"))
+    export_table_columnar(_source(rows), bucket, "Scores", "exports/scores")
+    work_dir = str(tmp_path / "work")
+
+    import_columnar_from_gcs(FakeSpannerDatabase(), bucket, "exports/scores", "Scores", local_dir=work_dir)
+    destination = FakeSpannerDatabase()
+    assert import_columnar_from_gcs(destination, bucket, "exports/scores", "Scores", local_dir=work_dir) == 0
+    assert destination.commits == 0
+
+def test_empty_shard_leaves_no_checkpoint(tmp_path):
+    bucket = LocalBucket(str(tmp_path / "bucket"))
+    export_table_columnar(_source([], partitions=1), bucket, "Scores", "exports/scores", fmt="arrow")
+    path = str(tmp_path / "bucket" / "exports" / "scores" / "part-00000.arrow")
+    checkpoint_path = str(tmp_path / "part.checkpoint")
+
+    stats = load_columnar_to_spanner(FakeSpannerDatabase(), "Scores", path, checkpoint_path=checkpoint_path)
+
+    assert stats["rows"] == 0
+    assert not (tmp_path / "part.checkpoint").exists()